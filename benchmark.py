@@ -0,0 +1,566 @@
+# benchmark.py
+"""
+Микро-бенчмарки горячих путей проекта.
+
+    python benchmark.py parsing [--fixtures DIR] [--repeat N]
+    python benchmark.py bot [--messages N] [--latency S] [--workers N]
+    python benchmark.py startup [--data PATH]
+    python benchmark.py search [--sizes N ...] [--queries N] [--messages N]
+
+Любой набор можно сохранить для сравнения между прогонами:
+
+    python benchmark.py --json bench/2024-05-01.json search
+
+С --json - в stdout идет только JSON, а человекочитаемый отчет — в stderr.
+
+Фикстуры — сохраненные страницы demonlist.org: list.html (главная со всеми
+карточками) и любое число страниц уровней level_*.html. Без --fixtures
+страницы генерируются из data/demonlist.json в той же разметке.
+
+Старт бота сравнивает загрузку JSON и бинарного снимка: каждый вариант грузится
+в отдельном процессе, меряются время, память Python (tracemalloc) и пиковый RSS.
+
+Поиск меряется на data/demonlist.json и на синтетических наборах заданного
+размера (по умолчанию 10 000 и 100 000 уровней): загрузка from_file и снимка
+(время и память), задержки запросов по рангу, названию, длительности, составных
+и нечетких, и пропускная способность handle_message с заглушкой send_message —
+без кэша ответов и с ним.
+
+Нагрузочный тест бота гоняет синхронный и асинхронный режимы против локального
+фейкового Telegram API, который отвечает на sendMessage с заданной задержкой.
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import settings
+from parsers import parse_cards, parse_details
+
+
+def _timeit(func, repeat: int) -> float:
+    """Лучшее время одного прогона func из repeat попыток (секунды)."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _report(title: str, baseline: float, fast: float):
+    print(f"{title}: BeautifulSoup {baseline * 1000:.2f} мс, новый парсер {fast * 1000:.2f} мс "
+          f"(x{baseline / fast:.1f})")
+
+
+# --- Разбор HTML ---
+
+def _bs4_parse_cards(html: str) -> list:
+    """Прежний путь DemonlistScraper._extract_levels_list."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    cards = []
+    for card in soup.select('a[href^="/classic/"]'):
+        name_tag = card.select_one("p.font-bold")
+        cards.append((card.get("href", ""), name_tag.get_text(strip=True) if name_tag else ""))
+    return cards
+
+
+def _bs4_parse_details(html: str) -> dict:
+    """Прежний путь DemonlistScraper._parse_level_details."""
+    from bs4 import BeautifulSoup
+
+    details = {"length": None, "objects": None, "version": None}
+    for tag in BeautifulSoup(html, "html.parser").find_all("p", class_="font-bold"):
+        label_text = tag.get_text(strip=True).lower()
+        value_tag = tag.find_next_sibling("p")
+        if value_tag:
+            value_text = value_tag.get_text(strip=True)
+            if "length" in label_text: details["length"] = value_text
+            elif "objects" in label_text: details["objects"] = int(value_text.replace(",", ""))
+            elif "version" in label_text: details["version"] = value_text
+    return details
+
+
+def _synthetic_fixtures(limit: int = 50):
+    with open(settings.OUTPUT_FILE, "r", encoding="utf-8") as f:
+        levels = json.load(f)
+    cards = "".join(
+        f'<a href="/classic/{lvl["rank"]}" class="w-full"><div class="flex gap-2">'
+        f'<img src="/thumb/{lvl["rank"]}.webp"><div>'
+        f'<p class="font-bold text-lg">#{lvl["rank"]} - {lvl["name"]}</p>'
+        f'<p class="text-sm">published by someone</p></div></div></a>'
+        for lvl in levels
+    )
+    list_html = f'<html><body><div class="w-[90%] mx-auto grid justify-items-center">{cards}</div></body></html>'
+    details_html = [
+        f'<html><body><h1>{lvl["name"]}</h1><div class="grid">'
+        f'<div><p class="font-bold">Length</p><p>{lvl.get("length")}</p></div>'
+        f'<div><p class="font-bold">Objects</p><p>{lvl.get("objects") or 0:,}</p></div>'
+        f'<div><p class="font-bold">Version</p><p>{lvl.get("version")}</p></div>'
+        f'</div></body></html>'
+        for lvl in levels[:limit]
+    ]
+    return list_html, details_html
+
+
+def _load_fixtures(path: str):
+    with open(os.path.join(path, "list.html"), "r", encoding="utf-8") as f:
+        list_html = f.read()
+    details_html = []
+    for name in sorted(glob.glob(os.path.join(path, "level_*.html"))):
+        with open(name, "r", encoding="utf-8") as f:
+            details_html.append(f.read())
+    return list_html, details_html
+
+
+def bench_parsing(fixtures: str = None, repeat: int = 5) -> dict:
+    list_html, details_html = _load_fixtures(fixtures) if fixtures else _synthetic_fixtures()
+
+    # Оба пути обязаны давать одинаковый результат, иначе сравнение бессмысленно
+    assert parse_cards(list_html) == _bs4_parse_cards(list_html)
+    assert all(parse_details(h) == _bs4_parse_details(h) for h in details_html)
+
+    results = {
+        "cards": len(parse_cards(list_html)),
+        "details_pages": len(details_html),
+        "list_bs4_s": _timeit(lambda: _bs4_parse_cards(list_html), repeat),
+        "list_fast_s": _timeit(lambda: parse_cards(list_html), repeat),
+        "details_bs4_s": _timeit(lambda: [_bs4_parse_details(h) for h in details_html], repeat),
+        "details_fast_s": _timeit(lambda: [parse_details(h) for h in details_html], repeat),
+    }
+    print(f"📄 Карточек: {results['cards']}, страниц уровней: {results['details_pages']}")
+    _report("Список уровней", results["list_bs4_s"], results["list_fast_s"])
+    _report("Страницы уровней", results["details_bs4_s"], results["details_fast_s"])
+    return results
+
+
+# --- Нагрузочный тест бота ---
+
+class FakeTelegramApi:
+    """Локальный фейковый Telegram Bot API: отдает заранее заготовленные апдейты и считает ответы."""
+
+    def __init__(self, updates: list, latency: float):
+        self.updates = updates
+        self.latency = latency
+        self.sent = 0
+        self.done = threading.Event()
+        self._loop = None
+        self._runner = None
+
+    async def _get_updates(self, request):
+        from aiohttp import web
+
+        offset = int(request.query.get("offset") or 0)
+        batch = [u for u in self.updates if u["update_id"] >= offset][:100]
+        if not batch:
+            await asyncio.sleep(0.05)
+        return web.json_response({"ok": True, "result": batch})
+
+    async def _send_message(self, request):
+        from aiohttp import web
+
+        await request.post()
+        await asyncio.sleep(self.latency)
+        self.sent += 1
+        if self.sent >= len(self.updates):
+            self.done.set()
+        return web.json_response({"ok": True, "result": {}})
+
+    def start(self) -> str:
+        """Поднимает сервер в отдельном потоке и возвращает базовый URL API бота."""
+        from aiohttp import web
+
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+        ready = threading.Event()
+
+        async def serve():
+            app = web.Application()
+            app.router.add_get("/{token}/getUpdates", self._get_updates)
+            app.router.add_post("/{token}/sendMessage", self._send_message)
+            self._runner = web.AppRunner(app)
+            await self._runner.setup()
+            await web.SockSite(self._runner, sock).start()
+            ready.set()
+
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(serve(), self._loop)
+        ready.wait()
+        return f"http://127.0.0.1:{port}/botTEST"
+
+    def reset(self):
+        self.sent = 0
+        self.done.clear()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def _fake_updates(levels: list, count: int) -> list:
+    random.seed(42)
+    queries = []
+    for _ in range(count):
+        level = random.choice(levels)
+        queries.append(random.choice([
+            str(level["rank"]),
+            level["name"],
+            level["name"][:4],
+            f"len > {random.randint(60, 300)}",
+        ]))
+    return [
+        {"update_id": i + 1, "message": {"message_id": i + 1, "chat": {"id": 1000 + i % 50}, "text": q}}
+        for i, q in enumerate(queries)
+    ]
+
+
+def bench_bot(messages: int = 500, latency: float = 0.05, workers: int = settings.BOT_WORKERS) -> dict:
+    import requests
+
+    from bot import DemonlistBotSync
+    from bot_async import DemonlistBotAsync
+    from search import LevelSearch
+    from sender import RateLimiter, TelegramSender
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        searcher = LevelSearch.from_file(settings.OUTPUT_FILE)
+    api = FakeTelegramApi(_fake_updates(searcher.data, messages), latency)
+    api_url = api.start()
+    results = {"messages": messages, "latency_s": latency, "workers": workers}
+
+    # Синхронный бот: тот же цикл, что в DemonlistBotSync.run, но до последнего ответа.
+    # Меряется обработка, а не лимиты Telegram, поэтому отправка без ограничений
+    bot = DemonlistBotSync()
+    bot.searcher, bot.api_url = searcher, api_url
+    bot.sender = TelegramSender(RateLimiter.unlimited())
+    started = time.perf_counter()
+    while not api.done.is_set():
+        updates = requests.get(f"{api_url}/getUpdates", params={"offset": bot.offset}, timeout=10).json()["result"]
+        for update in updates:
+            bot.offset = update["update_id"] + 1
+            bot.handle_message(update["message"])
+    results["sync_msg_per_s"] = messages / (time.perf_counter() - started)
+    bot.sender.close()
+
+    api.reset()
+    bot = DemonlistBotAsync(workers)
+    bot.searcher, bot.api_url, bot.limiter = searcher, api_url, RateLimiter.unlimited()
+
+    async def run_async():
+        task = asyncio.create_task(bot.run_async())
+        await asyncio.get_running_loop().run_in_executor(None, api.done.wait)
+        bot.stop()
+        await task
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(run_async())
+    results["async_msg_per_s"] = messages / (time.perf_counter() - started)
+    api.stop()
+
+    print(f"🤖 {messages} сообщений, задержка Telegram API {latency * 1000:.0f} мс")
+    print(f"Синхронный бот: {results['sync_msg_per_s']:.1f} сообщ./с")
+    print(f"Асинхронный бот ({workers} воркеров): {results['async_msg_per_s']:.1f} сообщ./с "
+          f"(x{results['async_msg_per_s'] / results['sync_msg_per_s']:.1f})")
+    return results
+
+
+# --- Старт: JSON против снимка ---
+
+def _measure_load(kind: str, path: str, source: str = None) -> dict:
+    """Запускается в дочернем процессе: грузит данные одним способом и меряет затраты."""
+    import resource
+    import tracemalloc
+
+    from search import LevelSearch
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        searcher = LevelSearch.from_file(path) if kind == "json" else LevelSearch.from_snapshot(path, source)
+        # Первый запрос тоже входит в "старт": ленивые структуры должны прогреться
+        searcher.query("len > 1m rank 1-100")
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "kind": kind,
+        "levels": len(searcher.data),
+        "load_s": elapsed,
+        "python_mem_bytes": current,
+        "python_peak_bytes": peak,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def _measure_in_subprocess(kind: str, path: str, source: str = None) -> dict:
+    args = [sys.executable, os.path.abspath(__file__), "_load", kind, path] + ([source] if source else [])
+    output = subprocess.run(args, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _baseline_rss_kb() -> int:
+    """RSS процесса, который только импортировал модули поиска — вычитается из замеров."""
+    code = "import resource, search; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+    return int(subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip())
+
+
+def bench_startup(path: str = settings.OUTPUT_FILE) -> dict:
+    from search import LevelSearch
+    from snapshot import write_snapshot
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "bench.snap")
+        with contextlib.redirect_stdout(io.StringIO()):
+            write_snapshot(LevelSearch.from_file(path), snapshot_path, source=path)
+        baseline = _baseline_rss_kb()
+        results = {
+            "json": _measure_in_subprocess("json", path),
+            "snapshot": _measure_in_subprocess("snapshot", snapshot_path, path),
+            "snapshot_bytes": os.path.getsize(snapshot_path),
+            "json_bytes": os.path.getsize(path),
+            "baseline_rss_kb": baseline,
+        }
+
+    print(f"🚀 Старт на {results['json']['levels']} уровнях (JSON {results['json_bytes'] // 1024} КБ, "
+          f"снимок {results['snapshot_bytes'] // 1024} КБ)")
+    for kind in ("json", "snapshot"):
+        r = results[kind]
+        print(f"{kind:>8}: {r['load_s'] * 1000:7.1f} мс, память Python {r['python_mem_bytes'] / 1024:8.0f} КБ, "
+              f"RSS +{r['max_rss_kb'] - baseline} КБ")
+    return results
+
+
+# --- Поиск, загрузка и handle_message на разных объемах ---
+
+SYLLABLES = ("ka", "ro", "mi", "zen", "tal", "vor", "lux", "nek", "dra", "sol", "phi", "qu")
+
+
+def _synthetic_dataset(base: list, size: int, seed: int = 42) -> list:
+    """Набор из size уровней по образцу base: похожие названия, длины, число объектов и версии."""
+    rng = random.Random(seed)
+    levels = []
+    for rank in range(1, size + 1):
+        sample = base[(rank - 1) % len(base)]
+        suffix = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+        minutes, seconds = rng.randint(0, 4), rng.randint(0, 59)
+        levels.append({
+            "rank": rank,
+            "name": sample["name"] if rank <= len(base) else f"{sample['name']} {suffix.capitalize()}",
+            "link": f"{settings.BASE_URL}/classic/{rank}",
+            "length": f"{minutes}:{seconds:02d}",
+            "objects": rng.choice((None, rng.randint(5_000, 900_000))),
+            "version": sample.get("version"),
+        })
+    return levels
+
+
+def _latency_stats(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_us": sum(ordered) / len(ordered) * 1e6,
+        "p50_us": ordered[len(ordered) // 2] * 1e6,
+        "p95_us": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1e6,
+        "max_us": ordered[-1] * 1e6,
+    }
+
+
+def _query_workload(levels: list, count: int, seed: int = 7) -> dict:
+    """Запросы по типам; по count штук, из реальных названий и рангов набора."""
+    rng = random.Random(seed)
+    names = [lvl["name"] for lvl in levels]
+    size = len(levels)
+
+    def typo(name):
+        i = rng.randrange(len(name))
+        return name[:i] + name[i + 1:] if len(name) > 4 else name + "x"
+
+    return {
+        "rank": [str(rng.randint(1, size)) for _ in range(count)],
+        "name": [rng.choice(names) for _ in range(count)],
+        "name_part": [(lambda n: n[:rng.randint(3, max(3, min(6, len(n))))])(rng.choice(names)) for _ in range(count)],
+        "duration": [f"len > {rng.randint(30, 280)}s" for _ in range(count)],
+        "combined": [f"len >= {rng.randint(1, 3)}m rank 1-{rng.randint(1, size)} objects < {rng.randint(100, 900)}k"
+                     for _ in range(count)],
+        "fuzzy": [typo(rng.choice(names)) for _ in range(count)],
+    }
+
+
+def _measure_queries(searcher, workload: dict) -> dict:
+    results = {}
+    for kind, queries in workload.items():
+        run = searcher.search_fuzzy if kind == "fuzzy" else searcher.query
+        samples = []
+        for query in queries:
+            started = time.perf_counter()
+            run(query)
+            samples.append(time.perf_counter() - started)
+        results[kind] = _latency_stats(samples)
+        if kind != "fuzzy":
+            # Первая страница ответа бота — ленивый курсор вместо полного списка
+            samples = []
+            for query in queries:
+                started = time.perf_counter()
+                searcher.page(query)
+                samples.append(time.perf_counter() - started)
+            results[f"{kind}_page"] = _latency_stats(samples)
+    return results
+
+
+def _measure_handle_message(searcher, workload: dict, messages: int, cached: bool, seed: int = 11) -> dict:
+    """Сквозная обработка сообщений ботом; send_message заменен заглушкой."""
+    from bot import DemonlistBotSync
+    from cache import ReplyCache
+
+    rng = random.Random(seed)
+    queries = [q for group in workload.values() for q in group]
+    # Реалистичный поток: большая часть сообщений — небольшое число популярных запросов
+    popular = queries[:50]
+    stream = [rng.choice(popular) if rng.random() < 0.8 else rng.choice(queries) for _ in range(messages)]
+
+    bot = DemonlistBotSync()
+    bot.searcher = searcher
+    bot.send_message = lambda chat_id, text, reply_markup=None: None
+    if not cached:
+        bot.reply_cache = ReplyCache(maxsize=0)
+    started = time.perf_counter()
+    for i, text in enumerate(stream):
+        bot.handle_message({"message_id": i, "chat": {"id": 1000 + i % 50}, "text": text})
+    elapsed = time.perf_counter() - started
+    return {"messages": messages, "msg_per_s": messages / elapsed, "cache": bot.reply_cache.stats()}
+
+
+def bench_search(sizes=(10_000, 100_000), queries: int = 200, messages: int = 2000,
+                 path: str = settings.OUTPUT_FILE) -> dict:
+    from search import LevelSearch
+    from snapshot import write_snapshot
+
+    with open(path, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    results = {"datasets": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        datasets = [("real", path, len(base))]
+        for size in sizes:
+            synthetic_path = os.path.join(tmp, f"synthetic_{size}.json")
+            with open(synthetic_path, "w", encoding="utf-8") as f:
+                json.dump(_synthetic_dataset(base, size), f)
+            datasets.append(("synthetic", synthetic_path, size))
+
+        for kind, data_path, size in datasets:
+            snapshot_path = os.path.join(tmp, f"{kind}_{size}.snap")
+            with contextlib.redirect_stdout(io.StringIO()):
+                searcher = LevelSearch.from_file(data_path)
+                write_snapshot(searcher, snapshot_path, source=data_path)
+            workload = _query_workload(searcher.data, queries)
+            entry = {
+                "dataset": kind,
+                "levels": size,
+                "load": {
+                    "json": _measure_in_subprocess("json", data_path),
+                    "snapshot": _measure_in_subprocess("snapshot", snapshot_path, data_path),
+                },
+                "queries": _measure_queries(searcher, workload),
+            }
+            with contextlib.redirect_stdout(io.StringIO()):
+                entry["handle_message"] = {
+                    "uncached": _measure_handle_message(searcher, workload, messages, cached=False),
+                    "cached": _measure_handle_message(searcher, workload, messages, cached=True),
+                }
+            results["datasets"].append(entry)
+
+            print(f"\n📚 {kind}: {size} уровней")
+            for loader, r in entry["load"].items():
+                print(f"  загрузка {loader:>8}: {r['load_s'] * 1000:8.1f} мс, память Python "
+                      f"{r['python_mem_bytes'] / 1024 / 1024:6.1f} МБ (пик {r['python_peak_bytes'] / 1024 / 1024:.1f} МБ)")
+            for query_kind, r in entry["queries"].items():
+                print(f"  {query_kind:>14}: p50 {r['p50_us']:9.1f} мкс, p95 {r['p95_us']:9.1f} мкс")
+            for mode, r in entry["handle_message"].items():
+                print(f"  handle_message {mode:>8}: {r['msg_per_s']:9.0f} сообщ./с "
+                      f"(попаданий в кэш {r['cache']['hit_rate']:.0%})")
+    return results
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки get_top_gd_lvls")
+    parser.add_argument("--json", metavar="PATH", help="сохранить результаты в JSON ('-' — в stdout)")
+    sub = parser.add_subparsers(dest="suite", required=True)
+    parsing = sub.add_parser("parsing", help="разбор HTML: BeautifulSoup против однопроходного парсера")
+    parsing.add_argument("--fixtures", help="папка с list.html и level_*.html")
+    parsing.add_argument("--repeat", type=int, default=5)
+    bot = sub.add_parser("bot", help="пропускная способность sync и async бота против фейкового Telegram API")
+    bot.add_argument("--messages", type=int, default=500)
+    bot.add_argument("--latency", type=float, default=0.05, help="задержка ответа sendMessage, с")
+    bot.add_argument("--workers", type=int, default=settings.BOT_WORKERS)
+    startup = sub.add_parser("startup", help="загрузка данных: JSON против бинарного снимка")
+    startup.add_argument("--data", default=settings.OUTPUT_FILE, help="JSON с уровнями")
+    search = sub.add_parser("search", help="загрузка, задержки запросов и handle_message на разных объемах")
+    search.add_argument("--data", default=settings.OUTPUT_FILE, help="JSON с реальными уровнями")
+    search.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000], help="размеры синтетических наборов")
+    search.add_argument("--queries", type=int, default=200, help="запросов каждого типа")
+    search.add_argument("--messages", type=int, default=2000, help="сообщений для handle_message")
+    load = sub.add_parser("_load")  # служебная: замер в дочернем процессе
+    load.add_argument("kind", choices=("json", "snapshot"))
+    load.add_argument("path")
+    load.add_argument("source", nargs="?")
+    args = parser.parse_args()
+
+    if args.suite == "_load":
+        print(json.dumps(_measure_load(args.kind, args.path, args.source)))
+        return
+    # С --json - stdout занят JSON-документом, отчет уходит в stderr
+    with contextlib.redirect_stdout(sys.stderr if args.json == "-" else sys.stdout):
+        if args.suite == "startup":
+            results = bench_startup(args.data)
+        elif args.suite == "parsing":
+            results = bench_parsing(args.fixtures, args.repeat)
+        elif args.suite == "bot":
+            results = bench_bot(args.messages, args.latency, args.workers)
+        else:
+            results = bench_search(args.sizes, args.queries, args.messages, args.data)
+
+    if args.json:
+        options = {k: v for k, v in vars(args).items() if k not in ("json", "suite")}
+        report = json.dumps({"suite": args.suite, "options": options, "environment": _environment(),
+                             "results": results}, ensure_ascii=False, indent=2)
+        if args.json == "-":
+            print(report)
+        else:
+            os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+            with open(args.json, "w", encoding="utf-8") as f:
+                f.write(report)
+            print(f"\n💾 Результаты: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
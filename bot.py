@@ -1,114 +1,265 @@
+import hashlib
+import html
+import json
 import requests
 import time
 import os
+import metrics
+from cache import ReplyCache
+from lists import list_title
 from search import LevelSearch
-from settings import BOT_TOKEN, LOCAL_DATA_PATH
+from sender import AdminNotifier, RateLimiter, TelegramSender
+from query import LevelQuery, QueryError
+from storage import DatasetWatcher
+from sync import diff_datasets
+from settings import BOT_TOKEN, DEFAULT_LIST, LOCAL_DATA_PATH, PAGE_QUERIES_SIZE, PAGE_QUERIES_TTL
 from datetime import datetime
 
+REQUESTS = metrics.counter("bot_requests_total", "Обработанные сообщения и нажатия кнопок", ("kind",))
+REPLY_SECONDS = metrics.histogram("bot_reply_build_seconds", "Построение ответа целиком (с кэшем)", ("kind",))
+SEARCH_SECONDS = metrics.histogram("bot_search_seconds", "Поиск по типу запроса", ("query_type",))
+REPLY_CACHE = metrics.counter("bot_reply_cache_total", "Обращения к кэшу ответов", ("result",))
+DATASET_LEVELS = metrics.gauge("bot_dataset_levels", "Уровней в текущем снимке данных")
+DATASET_RELOADS = metrics.counter("bot_dataset_reloads_total", "Подмены снимка данных в фоне")
+
 class DemonlistBotSync:
     def __init__(self):
         self.token = BOT_TOKEN
         self.api_url = f"https://api.telegram.org/bot{self.token}"
         self.searcher = None
         self.offset = None
-        self._last_mtime = None  # для отслеживания изменений JSON
+        self.watcher = None  # фоновое слежение за изменениями JSON
+        self.reply_cache = ReplyCache()
+        self.data_version = 0  # растет при каждой подмене данных, входит в ключ кэша
+        # Запросы, на которые ссылаются кнопки листания (callback_data ограничена 64 байтами)
+        self.page_queries = ReplyCache(maxsize=PAGE_QUERIES_SIZE, ttl=PAGE_QUERIES_TTL)
+        # Все исходящие запросы идут через очередь с лимитами Telegram (см. sender.py)
+        self.limiter = RateLimiter()
+        self.sender = TelegramSender(self.limiter)
+        self.admin = None
 
     def load_data(self):
         if os.path.exists(LOCAL_DATA_PATH):
             print(f"🔄 [{datetime.now()}] Загружаем данные из локального JSON...")
-            self.searcher = LevelSearch.from_file(LOCAL_DATA_PATH)
+            self.searcher = LevelSearch.load(LOCAL_DATA_PATH)
             print(f"✅ Данные загружены, уровней: {len(self.searcher.data)}")
         else:
             print("⚠️ Локальный файл demonlist.json не найден!")
             self.searcher = LevelSearch([])
+        DATASET_LEVELS.set(len(self.searcher.data))
 
-    def reload_data(self):
-        """Обновляем данные после изменения JSON"""
-        self.load_data()
+    def _swap_searcher(self, searcher):
+        """
+        Подменяет снимок данных одним присваиванием ссылки. Запросы, которые уже
+        взяли старый LevelSearch, дорабатывают на нем; сам снимок не меняется.
+        Версия увеличивается после подмены, а build_reply читает ее до снимка:
+        ответ по старым данным никогда не попадет в кэш под новой версией.
+        """
+        self.searcher = searcher
+        self.data_version += 1
+        self.reply_cache.clear()
+        DATASET_RELOADS.inc()
+        DATASET_LEVELS.set(len(searcher.data))
 
-    def check_reload(self):
-        """Проверяет, обновился ли JSON, и перезагружает данные"""
-        try:
-            mtime = os.path.getmtime(LOCAL_DATA_PATH)
-            if self._last_mtime is None:
-                self._last_mtime = mtime
-            elif mtime != self._last_mtime:
-                print("🔄 Обнаружено обновление demonlist.json, перезагружаем данные...")
-                self.reload_data()
-                self._last_mtime = mtime
-        except FileNotFoundError:
-            pass
-
-    def send_message(self, chat_id, text):
+    def _rebuild_searcher(self, data):
+        """Новый снимок по обновленному JSON: если поменялись только детали, индексы правятся точечно."""
+        current = self.searcher
+        if current is None or not current.data:
+            return LevelSearch(data)
+        diff = diff_datasets(current.data, data)
+        print(f"🧮 Изменения в данных: {diff.summary()}")
+        self.notify_admin(f"🔄 Бот перезагрузил данные: {diff.summary()}")
+        return current.apply_diff(diff, data)
+
+    def notify_admin(self, text):
+        """Уведомление админу; близкие по времени уведомления склеиваются в одно сообщение."""
+        if self.admin is None:
+            self.admin = AdminNotifier(self.sender, self.api_url)
+        self.admin.notify(text)
+
+    def start_watcher(self):
+        """Запускает фоновую перезагрузку данных при изменении JSON."""
+        if self.watcher is None:
+            self.watcher = DatasetWatcher(
+                LOCAL_DATA_PATH, self._rebuild_searcher, self._swap_searcher,
+                on_error=lambda e: self.notify_admin(f"⚠️ Новые данные не прошли проверку, бот остался на старых: {e}"),
+            )
+            self.watcher.start()
+
+    def stop_watcher(self):
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+
+    @staticmethod
+    def _message_data(chat_id, text, reply_markup=None, **fields) -> dict:
         data = {
             "chat_id": chat_id,
             "text": text,
             "parse_mode": "HTML",
-            "disable_web_page_preview": True
+            "disable_web_page_preview": "true",
+            **fields,
         }
-        try:
-            requests.post(f"{self.api_url}/sendMessage", data=data, timeout=10)
-        except Exception as e:
-            print(f"❌ Не удалось отправить сообщение: {e}")
+        if reply_markup is not None:
+            data["reply_markup"] = json.dumps(reply_markup)
+        return data
+
+    def send_message(self, chat_id, text, reply_markup=None):
+        self.sender.send(f"{self.api_url}/sendMessage", self._message_data(chat_id, text, reply_markup), chat_id)
+
+    def edit_message(self, chat_id, message_id, text, reply_markup=None):
+        data = self._message_data(chat_id, text, reply_markup, message_id=message_id)
+        self.sender.send(f"{self.api_url}/editMessageText", data, chat_id)
+
+    def answer_callback(self, callback_id, text=None):
+        data = {"callback_query_id": callback_id}
+        if text:
+            data["text"] = text
+        self.sender.send(f"{self.api_url}/answerCallbackQuery", data)
 
     def handle_message(self, message):
         chat_id = message["chat"]["id"]
-        text = message.get("text", "")
+        self.send_message(chat_id, *self.build_reply(message.get("text", "")))
+
+    def handle_callback(self, callback):
+        """Кнопка листания: новая страница заменяет текст того же сообщения."""
+        reply = self.build_page(callback.get("data", ""))
+        message = callback.get("message")
+        if reply is None or message is None:
+            self.answer_callback(callback["id"], "⌛ Запрос устарел, отправь его заново.")
+            return
+        self.answer_callback(callback["id"])
+        self.edit_message(message["chat"]["id"], message["message_id"], *reply)
+
+    def build_reply(self, text):
+        """
+        Ответ на текст сообщения (общая логика для всех режимов бота):
+        (HTML-текст, inline-клавиатура для листания или None).
+        """
+        REQUESTS.inc(kind="message")
+        with REPLY_SECONDS.time(kind="message"):
+            return self._build_reply(text)
 
+    def _build_reply(self, text):
         if text.startswith("/start"):
-            start_text = (
+            return (
                 "👋 Привет! Я бот для поиска уровней из Demonlist.\n\n"
                 "📌 Примеры запросов:\n"
                 " - <b>1</b> — поиск по рангу\n"
                 " - <b>slaughterhouse</b> — поиск по названию\n"
-                " - <b>len > 2m30s</b> или <b>len > 150s</b> — поиск по длине"
-            )
-            self.send_message(chat_id, start_text)
-            return
+                " - <b>len &gt; 2m30s</b> или <b>len &gt; 150s</b> — поиск по длине\n"
+                " - <b>len &gt;= 2m rank 1-100 objects &lt; 200000 version 2.2 name:wave</b> — "
+                "несколько фильтров сразу (len, rank, objects, version, name)\n"
+                " - <b>list:platformer 1-10</b> — только один список (classic, platformer, challenge); "
+                "без него ищем во всех"
+            ), None
 
         query = text.strip()
         if not query:
-            self.send_message(chat_id, "❌ Пустой запрос.")
-            return
+            return "❌ Пустой запрос.", None
+        return self._cached_page(query)
 
-        if not self.searcher or not self.searcher.data:
-            self.send_message(chat_id, "⚠️ Данные ещё не загружены. Попробуй чуть позже.")
-            return
+    def build_page(self, data):
+        """Страница по callback_data кнопки листания. None — запрос забыт или данные кнопки битые."""
+        REQUESTS.inc(kind="callback")
+        with REPLY_SECONDS.time(kind="callback"):
+            return self._build_page(data)
 
-        if query.lower().startswith("len >"):
-            results = self.searcher.search_by_duration(query[5:].strip())
-        else:
-            results = self.searcher.search_by_name_or_rank(query)
+    def _build_page(self, data):
+        try:
+            prefix, token, direction, cursor, page = data.split(":")
+            # Курсор — "список.ранг"; кнопки, отправленные до мультисписков, содержат только ранг
+            list_name, _, rank = cursor.rpartition(".")
+            cursor, page = (list_name or DEFAULT_LIST, int(rank)), int(page)
+        except ValueError:
+            return None
+        query = self.page_queries.get(token)
+        if prefix != "pg" or query is None:
+            return None
+        return self._cached_page(query, cursor, direction == "p", page)
 
-        if not results:
-            self.send_message(chat_id, "😔 Ничего не найдено.")
-            return
+    @staticmethod
+    def _query_token(query: str) -> str:
+        return hashlib.sha1(query.encode("utf-8")).hexdigest()[:12]
 
-        results = sorted(results, key=lambda x: x["rank"])
-        reply_parts = []
-        for r in results[:10]:
-            duration = r["duration_seconds"]
-            length_str = f"{duration // 60}:{duration % 60:02d}"
-            reply_parts.append(
-                f"#{r['rank']} — <b>{r['name']}</b>\n"
-                f"🕒 {length_str}\n"
-                f"🔗 <a href='{r['link']}'>Ссылка</a>"
-            )
+    def _cached_page(self, query, cursor=None, backward=False, page=1):
+        version = self.data_version  # до снимка, см. _swap_searcher
+        searcher = self.searcher  # один снимок на весь запрос
+        if not searcher or not searcher.data:
+            return "⚠️ Данные ещё не загружены. Попробуй чуть позже.", None
 
-        text_reply = "\n\n".join(reply_parts)
-        if len(results) > 10:
-            text_reply += f"\n\n...и ещё {len(results) - 10} результатов."
+        query = ReplyCache.normalize(query)
+        key = (version, query, cursor, backward, page)
+        reply = self.reply_cache.get(key)
+        REPLY_CACHE.inc(result="miss" if reply is None else "hit")
+        if reply is None:
+            reply = self._render_page(searcher, query, cursor, backward, page)
+            self.reply_cache.put(key, reply)
+        if reply[1] is not None:
+            self.page_queries.put(self._query_token(query), query)
+        return reply
 
-        self.send_message(chat_id, text_reply)
+    @staticmethod
+    def _format_level(r) -> str:
+        duration = r["duration_seconds"]
+        # Список по умолчанию не подписываем, чтобы не загромождать привычный ответ
+        tag = "" if r["list"] == DEFAULT_LIST else f" · {html.escape(list_title(r['list']))}"
+        return (
+            f"#{r['rank']}{tag} — <b>{html.escape(r['name'])}</b>\n"
+            f"🕒 {duration // 60}:{duration % 60:02d}\n"
+            f"🔗 <a href='{html.escape(r['link'])}'>Ссылка</a>"
+        )
+
+    def _render_page(self, searcher, query, cursor, backward, page):
+        """
+        Поиск и форматирование одной страницы — то, что экономит кэш. Строки страницы
+        берутся курсором (список, ранг) через LevelSearch.page, весь список совпадений не строится.
+        """
+        try:
+            parsed = LevelQuery.parse(query)
+        except QueryError as e:
+            return f"❌ {html.escape(str(e))}", None
+
+        with SEARCH_SECONDS.time(query_type=parsed.kind):
+            levels, more = searcher.page(parsed, cursor, backward=backward)
+        if not levels and cursor is None and parsed.is_name_only:
+            with SEARCH_SECONDS.time(query_type="fuzzy"):
+                levels = searcher.search_fuzzy(parsed.name, list_name=parsed.list)
+            if levels:
+                text = "\n\n".join(self._format_level(r) for r in levels)
+                return "🤔 Точных совпадений нет, возможно, вы имели в виду:\n\n" + text, None
+        if not levels:
+            return "😔 Ничего не найдено.", None
+
+        if backward:
+            has_prev, has_next = more, True
+            page = page if more else 1
+        else:
+            has_prev, has_next = page > 1, more
+        text = "\n\n".join(self._format_level(r) for r in levels)
+        if not (has_prev or has_next):
+            return text, None
+
+        token = self._query_token(query)
+        buttons = []
+        if has_prev:
+            first = levels[0]
+            buttons.append({"text": "⬅️ Назад",
+                            "callback_data": f"pg:{token}:p:{first['list']}.{first['rank']}:{page - 1}"})
+        if has_next:
+            last = levels[-1]
+            buttons.append({"text": "Вперёд ➡️",
+                            "callback_data": f"pg:{token}:n:{last['list']}.{last['rank'] + 1}:{page + 1}"})
+        return f"{text}\n\n📄 Страница {page}", {"inline_keyboard": [buttons]}
 
     def run(self):
         """Главный цикл polling бота с авто-обновлением JSON"""
         self.load_data()
+        self.start_watcher()
+        metrics.start_metrics_server()
         print("🤖 Бот запущен и ждёт сообщений...")
 
         while True:
-            self.check_reload()  # проверяем, нужно ли обновить данные
-
             params = {"timeout": 100, "offset": self.offset}
             try:
                 response = requests.get(f"{self.api_url}/getUpdates", params=params, timeout=120)
@@ -117,6 +268,8 @@ class DemonlistBotSync:
                     self.offset = update["update_id"] + 1
                     if "message" in update:
                         self.handle_message(update["message"])
+                    elif "callback_query" in update:
+                        self.handle_callback(update["callback_query"])
             except requests.exceptions.RequestException as e:
                 print(f"⚠️ Ошибка сети: {e}")
                 time.sleep(5)
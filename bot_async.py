@@ -0,0 +1,223 @@
+# bot_async.py
+import asyncio
+import hmac
+from collections import deque
+
+import aiohttp
+from aiohttp import web
+
+import metrics
+import settings
+from bot import DemonlistBotSync
+from sender import AsyncTelegramSender
+
+# Адреса, на которых вебхук без секрета недоступен снаружи
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+class DemonlistBotAsync(DemonlistBotSync):
+    """
+    Асинхронный режим бота: одна aiohttp-сессия с пулом соединений и
+    ограниченный пул воркеров, которые обрабатывают апдейты параллельно.
+    Логика ответов и загрузки данных — общая с DemonlistBotSync.
+    """
+
+    def __init__(self, workers: int = settings.BOT_WORKERS):
+        super().__init__()
+        self.workers = workers
+        self.session = None
+        self.queue = None
+        self.async_sender = None  # создается вместе с сессией в _serve
+        self._stop = None
+        # Последние update_id для отбрасывания повторных доставок вебхука
+        self._seen_order = deque(maxlen=settings.WEBHOOK_DEDUP_SIZE)
+        self._seen = set()
+
+    async def send_message_async(self, chat_id, text, reply_markup=None):
+        await self.async_sender.send(f"{self.api_url}/sendMessage",
+                                     self._message_data(chat_id, text, reply_markup), chat_id)
+
+    async def edit_message_async(self, chat_id, message_id, text, reply_markup=None):
+        data = self._message_data(chat_id, text, reply_markup, message_id=message_id)
+        await self.async_sender.send(f"{self.api_url}/editMessageText", data, chat_id)
+
+    async def answer_callback_async(self, callback_id, text=None):
+        data = {"callback_query_id": callback_id}
+        if text:
+            data["text"] = text
+        await self.async_sender.send(f"{self.api_url}/answerCallbackQuery", data)
+
+    async def handle_message_async(self, message):
+        chat_id = message["chat"]["id"]
+        await self.send_message_async(chat_id, *self.build_reply(message.get("text", "")))
+
+    async def handle_callback_async(self, callback):
+        reply = self.build_page(callback.get("data", ""))
+        message = callback.get("message")
+        if reply is None or message is None:
+            await self.answer_callback_async(callback["id"], "⌛ Запрос устарел, отправь его заново.")
+            return
+        await self.answer_callback_async(callback["id"])
+        await self.edit_message_async(message["chat"]["id"], message["message_id"], *reply)
+
+    async def _worker(self):
+        while True:
+            update = await self.queue.get()
+            try:
+                if "message" in update:
+                    await self.handle_message_async(update["message"])
+                elif "callback_query" in update:
+                    await self.handle_callback_async(update["callback_query"])
+            except Exception as e:
+                print(f"❌ Ошибка при обработке апдейта {update.get('update_id')}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _poll(self):
+        """Long polling getUpdates: апдейты складываются в очередь, ответы шлют воркеры."""
+        while not self._stop.is_set():
+            params = {"timeout": settings.BOT_POLL_TIMEOUT}
+            if self.offset is not None:
+                params["offset"] = self.offset
+            try:
+                async with self.session.get(
+                    f"{self.api_url}/getUpdates", params=params,
+                    timeout=aiohttp.ClientTimeout(total=settings.BOT_POLL_TIMEOUT + 20),
+                ) as response:
+                    payload = await response.json()
+                for update in payload.get("result", []):
+                    self.offset = update["update_id"] + 1
+                    # Очередь ограничена: при перегрузке поллер ждет, а не копит апдейты в памяти
+                    await self.queue.put(update)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"⚠️ Ошибка сети: {e}")
+                await asyncio.sleep(5)
+            except Exception as e:
+                print(f"❌ Ошибка: {e}")
+                await asyncio.sleep(5)
+
+    def _remember_update(self, update_id):
+        if len(self._seen_order) == self._seen_order.maxlen:
+            self._seen.discard(self._seen_order[0])
+        self._seen_order.append(update_id)
+        self._seen.add(update_id)
+
+    async def _handle_webhook(self, request):
+        """Принимает апдейт от Telegram: проверка секрета, дедупликация, постановка в очередь."""
+        token = request.headers.get("X-Telegram-Bot-Api-Secret-Token") or ""
+        if settings.WEBHOOK_SECRET and not hmac.compare_digest(token, settings.WEBHOOK_SECRET):
+            return web.Response(status=403)
+        try:
+            update = await request.json()
+            update_id = update["update_id"]
+        except (ValueError, KeyError, TypeError):
+            return web.Response(status=400)
+
+        if update_id in self._seen:
+            return web.Response(text="duplicate")
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            # Не 2xx — Telegram доставит апдейт повторно позже
+            return web.Response(status=503)
+        self._remember_update(update_id)
+        return web.Response(text="ok")
+
+    def make_webhook_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(settings.WEBHOOK_PATH, self._handle_webhook)
+        return app
+
+    async def _register_webhook(self):
+        if not settings.WEBHOOK_URL:
+            print("⚠️ WEBHOOK_URL не задан, setWebhook пропущен (локальный режим).")
+            return
+        data = {"url": settings.WEBHOOK_URL, "allowed_updates": '["message", "callback_query"]'}
+        if settings.WEBHOOK_SECRET:
+            data["secret_token"] = settings.WEBHOOK_SECRET
+        async with self.session.post(f"{self.api_url}/setWebhook", data=data) as response:
+            payload = await response.json()
+        if not payload.get("ok"):
+            raise RuntimeError(f"setWebhook не удался: {payload}")
+        print(f"🔗 Вебхук зарегистрирован: {settings.WEBHOOK_URL}")
+
+    def stop(self):
+        """Останавливает бота после обработки уже полученных апдейтов."""
+        if self._stop is not None:
+            self._stop.set()
+
+    async def _serve(self, source):
+        """Общий каркас режимов: сессия, воркеры и источник апдейтов (поллинг или вебхук)."""
+        if self.searcher is None:
+            self.load_data()
+        self.start_watcher()
+        metrics_server = metrics.start_metrics_server()
+        self._stop = asyncio.Event()
+        self.queue = asyncio.Queue(maxsize=settings.BOT_QUEUE_SIZE)
+        connector = aiohttp.TCPConnector(limit=settings.BOT_HTTP_POOL_SIZE)
+        timeout = aiohttp.ClientTimeout(total=settings.BOT_HTTP_TIMEOUT)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as self.session:
+            # Лимитер общий с синхронным отправителем (уведомления админу из потока наблюдателя)
+            self.async_sender = AsyncTelegramSender(self.session, self.limiter, self.workers)
+            workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+            tasks = await source()
+            await self._stop.wait()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.queue.join()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await self.async_sender.close()
+        self.stop_watcher()
+        if self.admin is not None:
+            self.admin.flush()
+        self.sender.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+
+    async def run_async(self):
+        """Long polling."""
+        async def source():
+            print(f"🤖 Асинхронный бот запущен ({self.workers} воркеров) и ждёт сообщений...")
+            return [asyncio.create_task(self._poll())]
+        await self._serve(source)
+
+    async def run_webhook_async(self, host: str = settings.WEBHOOK_HOST, port: int = settings.WEBHOOK_PORT):
+        """
+        Вебхук: встроенный HTTP-сервер принимает апдейты, ответы шлют те же воркеры.
+        Без WEBHOOK_SECRET любой, кто достучится до порта, может подсовывать апдейты,
+        поэтому без секрета сервер поднимается только на локальном адресе.
+        """
+        if not settings.WEBHOOK_SECRET:
+            if host not in LOOPBACK_HOSTS:
+                raise RuntimeError(f"WEBHOOK_SECRET не задан: отказываюсь принимать апдейты на {host}:{port} "
+                                   f"без проверки секрета (задайте секрет или WEBHOOK_HOST=127.0.0.1)")
+            print("⚠️⚠️⚠️ WEBHOOK_SECRET не задан: апдейты принимаются без проверки, "
+                  "только для локальной отладки!")
+        runner = web.AppRunner(self.make_webhook_app())
+
+        async def source():
+            await runner.setup()
+            await web.TCPSite(runner, host, port).start()
+            await self._register_webhook()
+            print(f"🤖 Бот в режиме вебхука слушает http://{host}:{port}{settings.WEBHOOK_PATH}")
+            return []
+
+        try:
+            await self._serve(source)
+        finally:
+            await runner.cleanup()
+
+    def run(self):
+        if settings.BOT_MODE == "webhook":
+            asyncio.run(self.run_webhook_async())
+        else:
+            asyncio.run(self.run_async())
+
+
+if __name__ == "__main__":
+    bot = DemonlistBotAsync()
+    bot.run()
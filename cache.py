@@ -0,0 +1,64 @@
+# cache.py
+"""
+Кэш готовых ответов бота: популярные запросы ('1', известные названия, 'len > 2m')
+не пересчитываются и не форматируются заново при каждом сообщении.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import settings
+
+
+class ReplyCache:
+    """LRU-кэш с временем жизни записей и счетчиками попаданий/промахов. Потокобезопасен."""
+
+    def __init__(self, maxsize: int = settings.REPLY_CACHE_SIZE, ttl: float = settings.REPLY_CACHE_TTL,
+                 clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # ключ -> (срок годности, ответ); в конце — самые свежие
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """'  LEN  >  2m ' и 'len > 2m' — один и тот же запрос."""
+        return " ".join(text.lower().split())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,62 @@
+# http_scraper.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import settings
+
+
+class HttpFetcher:
+    """
+    Пул HTTP-соединений для скачивания HTML без браузера:
+    keep-alive через одну requests.Session, ограниченный параллелизм и ретраи.
+    """
+
+    def __init__(self, base_url: str = settings.BASE_URL, concurrency: int = settings.HTTP_CONCURRENCY):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = settings.HTTP_USER_AGENT
+        retry = Retry(
+            total=settings.HTTP_RETRIES,
+            backoff_factor=settings.HTTP_BACKOFF,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, url: str) -> str:
+        """Возвращает HTML страницы; относительные пути считаются от base_url."""
+        response = self.session.get(urljoin(self.base_url, url), timeout=settings.HTTP_TIMEOUT)
+        response.raise_for_status()
+        return response.text
+
+    def fetch_many(self, urls: list):
+        """
+        Скачивает страницы параллельно (не больше concurrency запросов одновременно).
+        Генератор: страницы отдаются в порядке urls по мере загрузки, чтобы их можно
+        было сразу разбирать и записывать в журнал; на месте неудачных запросов — исключение.
+        """
+        def safe_fetch(url):
+            try:
+                return self.fetch(url)
+            except requests.RequestException as e:
+                return e
+
+        started = time.time()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            # Если потребитель остановится раньше, еще не начатые загрузки отменяются
+            yield from pool.map(safe_fetch, urls)
+        elapsed = time.time() - started
+        rate = len(urls) / elapsed if elapsed > 0 else 0.0
+        print(f"🌍 HTTP: скачано {len(urls)} страниц за {elapsed:.1f} с ({rate:.2f} стр./с)")
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,116 @@
+# lists.py
+"""
+Списки Demonlist (classic, platformer, challenge...) и разбор их страниц.
+
+Каждый список описывается экстрактором: где лежит страница списка, какие ссылки
+считаются карточками уровней и как из карточки получить уровень. Все списки
+хранятся в одном JSON: уровень однозначно задается парой (list, rank).
+Список с другой разметкой подключается подклассом ListExtractor и register_list().
+"""
+import re
+from urllib.parse import urljoin
+
+import settings
+from parsers import parse_cards
+
+
+# Сетка карточек на странице classic-списка: ее появление значит, что список отрисовался
+GRID_SELECTOR = 'div.w-\\[90\\%\\].mx-auto.grid.justify-items-center'
+
+
+class ListExtractor:
+    """Карточки списка — ссылки вида /<name>/<rank>, название — первый p.font-bold внутри."""
+
+    def __init__(self, name: str, path: str, title: str, aliases=(), container_selector: str = GRID_SELECTOR):
+        self.name = name            # значение поля "list" у уровней
+        self.path = path            # страница списка относительно BASE_URL
+        self.title = title          # как список показывается пользователю
+        self.aliases = tuple(aliases)
+        self.container_selector = container_selector  # чего ждать в Playwright до карточек
+        self.href_prefix = f"/{name}/"
+        self.card_selector = f'a[href^="{self.href_prefix}"]'
+        self.href_re = re.compile(rf"^{re.escape(self.href_prefix)}(\d+)")
+
+    def __repr__(self):
+        return f"ListExtractor({self.name!r})"
+
+    def url(self, base_url: str) -> str:
+        return urljoin(base_url, self.path)
+
+    def parse_cards(self, html: str) -> list:
+        """[(href, сырое имя)] из HTML страницы списка (HTTP-бэкенд)."""
+        return parse_cards(html, self.href_prefix)
+
+    @staticmethod
+    def clean_name(text: str) -> str:
+        """'#1 - Tidal Wave' -> 'Tidal Wave'."""
+        text = text.strip()
+        return text.split("-", 1)[1].strip() if "-" in text else text
+
+    def build_levels(self, cards, base_url: str) -> list:
+        """Превращает пары (href, сырое имя) в отсортированный по рангу список уровней."""
+        levels = []
+        for href, name_raw in cards:
+            match = self.href_re.match(href)
+            if not match: continue
+            levels.append({"list": self.name, "rank": int(match.group(1)),
+                           "name": self.clean_name(name_raw), "link": urljoin(base_url, href)})
+        levels.sort(key=lambda x: x["rank"])
+        return levels
+
+
+# Порядок регистрации — порядок списков в общем хранилище и в выдаче поиска
+LISTS = {}
+
+
+def register_list(extractor: ListExtractor):
+    LISTS[extractor.name] = extractor
+
+
+register_list(ListExtractor("classic", "/", "Classic"))
+# Адреса и разметка platformer/challenge на сайте еще не сверены, поэтому по умолчанию
+# они не собираются (settings.SCRAPE_LISTS); перед включением проверьте path, ссылки карточек
+# и container_selector
+register_list(ListExtractor("platformer", "/platformer", "Platformer", aliases=("plat",)))
+register_list(ListExtractor("challenge", "/challenge", "Challenge", aliases=("chal",)))
+
+
+def get_list(name: str) -> ListExtractor:
+    """Экстрактор по имени списка. Неизвестный список — ValueError."""
+    try:
+        return LISTS[name]
+    except KeyError:
+        raise ValueError(f"неизвестный список {name!r}, доступны: {', '.join(LISTS)}") from None
+
+
+def find_list(text: str):
+    """Имя списка по имени или сокращению из запроса пользователя, None — не найден."""
+    text = text.lower()
+    for extractor in LISTS.values():
+        if text == extractor.name or text in extractor.aliases:
+            return extractor.name
+    return None
+
+
+def list_title(name: str) -> str:
+    extractor = LISTS.get(name)
+    return extractor.title if extractor is not None else name
+
+
+def list_of(level) -> str:
+    """Список уровня; у записей без поля "list" (данные до мультисписков) — DEFAULT_LIST."""
+    return level.get("list") or settings.DEFAULT_LIST
+
+
+def list_order(name: str) -> int:
+    """Место списка в общем хранилище: зарегистрированные по порядку, остальные в конце."""
+    for i, registered in enumerate(LISTS):
+        if registered == name:
+            return i
+    return len(LISTS)
+
+
+def level_sort_key(level) -> tuple:
+    """Порядок уровней в общем хранилище: по спискам, внутри списка по рангу."""
+    name = list_of(level)
+    return list_order(name), name, level["rank"]
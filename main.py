@@ -1,10 +1,19 @@
 import asyncio
+import settings
 from bot import DemonlistBotSync
+from bot_async import DemonlistBotAsync
 
 def main():
     print("🚀 Запускаем Telegram-бота Demonlist...")
-    bot = DemonlistBotSync()
-    bot.run()
+    if settings.BOT_MODE == "sync":
+        bot = DemonlistBotSync()
+        bot.run()
+    elif settings.BOT_MODE == "webhook":
+        bot = DemonlistBotAsync()
+        asyncio.run(bot.run_webhook_async())
+    else:
+        bot = DemonlistBotAsync()
+        asyncio.run(bot.run_async())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
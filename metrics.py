@@ -0,0 +1,303 @@
+# metrics.py
+"""
+Метрики в текстовом формате Prometheus и профилирование по запросу.
+
+    curl 127.0.0.1:9108/metrics
+    curl -X POST 127.0.0.1:9108/debug/cprofile   # старт/стоп cProfile главного потока
+    curl 127.0.0.1:9108/debug/tracemalloc        # топ аллокаций (первый вызов включает трассировку)
+
+Без HTTP то же делают сигналы: kill -USR1 <pid> (cProfile), kill -USR2 <pid> (tracemalloc).
+Результаты профилирования пишутся в PROFILE_DIR.
+"""
+import cProfile
+import io
+import os
+import pstats
+import signal
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import settings
+from storage import atomic_write_text
+
+# Границы корзин гистограмм задержек (секунды)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        if not self.labelnames and self.kind != "histogram":
+            self._values[()] = 0  # метрика без меток видна сразу, с нулем
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: ожидались метки {self.labelnames}, получены {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {value:g}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._functions = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function, **labels):
+        """Значение вычисляется при каждом чтении метрик (например, длина очереди)."""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                continue
+        return [(self.name, key, (), value) for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            items = sorted((key, (list(state[0]), state[1], state[2])) for key, state in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key, (("le", f"{bound:g}"),), cumulative))
+            samples.append((f"{self.name}_bucket", key, (("le", "+Inf"),), count))
+            samples.append((f"{self.name}_sum", key, (), total))
+            samples.append((f"{self.name}_count", key, (), count))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, labels, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"метрика {name} уже зарегистрирована как {metric.kind}")
+            return metric
+
+    def counter(self, name, help_text, labels=()) -> Counter:
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()) -> Gauge:
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+    def write_textfile(self, path: str):
+        """Для разовых процессов (скрапер): файл для textfile-коллектора node_exporter."""
+        atomic_write_text(path, self.render())
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+# --- Профилирование ---
+
+class Profiler:
+    """cProfile главного потока (включается и выключается повторным вызовом) и снимки tracemalloc."""
+
+    def __init__(self, directory: str = settings.PROFILE_DIR):
+        self.directory = directory
+        self._profile = None
+        self._last_snapshot = None
+
+    def _path(self, prefix: str, ext: str) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"{prefix}-{datetime.now():%Y%m%d-%H%M%S}.{ext}")
+
+    def toggle_cprofile(self):
+        """Первый вызов включает профилировщик в текущем потоке, второй — пишет .prof и топ функций."""
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            print("🩺 cProfile включен")
+            return None
+        profile, self._profile = self._profile, None
+        profile.disable()
+        path = self._path("cprofile", "prof")
+        profile.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(profile, stream=report).sort_stats("cumulative").print_stats(40)
+        with open(path[:-len(".prof")] + ".txt", "w", encoding="utf-8") as f:
+            f.write(report.getvalue())
+        print(f"🩺 Профиль сохранен: {path}")
+        return path
+
+    def tracemalloc_report(self, limit: int = 30) -> str:
+        """Топ аллокаций по строкам и прирост с прошлого снимка. Первый вызов включает трассировку."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(settings.TRACEMALLOC_FRAMES)
+            return "tracemalloc включен, запросите отчет еще раз позже\n"
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"current={current} peak={peak}", "", "# top"]
+        lines += [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
+        if self._last_snapshot is not None:
+            lines += ["", "# diff"]
+            lines += [str(stat) for stat in snapshot.compare_to(self._last_snapshot, "lineno")[:limit]]
+        self._last_snapshot = snapshot
+        report = "\n".join(lines) + "\n"
+        with open(self._path("tracemalloc", "txt"), "w", encoding="utf-8") as f:
+            f.write(report)
+        return report
+
+    def install_signal_handlers(self) -> bool:
+        """SIGUSR1 — cProfile, SIGUSR2 — tracemalloc. Только из главного потока и где есть эти сигналы."""
+        if not hasattr(signal, "SIGUSR1") or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signal.SIGUSR1, lambda *_: self.toggle_cprofile())
+        signal.signal(signal.SIGUSR2, lambda *_: print(self.tracemalloc_report()))
+        return True
+
+
+PROFILER = Profiler()
+
+
+# --- HTTP ---
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+    profiler = PROFILER
+    signals = False
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, text: str, content_type: str = "text/plain; charset=utf-8"):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._reply(200, self.registry.render(), "text/plain; version=0.0.4; charset=utf-8")
+        elif self.path == "/debug/tracemalloc":
+            self._reply(200, self.profiler.tracemalloc_report())
+        else:
+            self._reply(404, "not found\n")
+
+    def do_POST(self):
+        if self.path != "/debug/cprofile":
+            self._reply(404, "not found\n")
+        elif not self.signals:
+            self._reply(501, "cProfile доступен только при обработчике SIGUSR1 в главном потоке\n")
+        else:
+            # Профилировать нужно главный поток (цикл бота), а не поток HTTP-сервера
+            os.kill(os.getpid(), signal.SIGUSR1)
+            self._reply(202, f"cProfile переключен, результаты в {self.profiler.directory}\n")
+
+
+def start_metrics_server(port: int = settings.METRICS_PORT, host: str = settings.METRICS_HOST):
+    """Поднимает /metrics и /debug/* в фоновом потоке. port 0 — выключено. Возвращает сервер или None."""
+    if not port:
+        return None
+    handler = type("MetricsHandler", (_Handler,), {"signals": PROFILER.install_signal_handlers()})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError as e:
+        print(f"⚠️ Не удалось поднять метрики на {host}:{port}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Метрики: http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,151 @@
+# parsers.py
+"""
+Быстрый разбор HTML Demonlist без построения дерева BeautifulSoup:
+один проход стандартного HTMLParser по документу.
+"""
+from html.parser import HTMLParser
+
+# Тэги без закрывающей пары — их нельзя класть в стек вложенности
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+})
+
+# Для Playwright: все поля карточек вытаскиваются в браузере одним вызовом $$eval,
+# без выгрузки и разбора всего DOM в Python.
+CARDS_EVAL_JS = """
+cards => cards.map(card => {
+    const name = card.querySelector('p.font-bold');
+    return {href: card.getAttribute('href') || '', name: name ? name.textContent.trim() : ''};
+})
+"""
+
+
+def _has_bold_class(attrs) -> bool:
+    for key, value in attrs:
+        if key == "class" and value and "font-bold" in value.split():
+            return True
+    return False
+
+
+class _CardsParser(HTMLParser):
+    """Собирает (href, name) из ссылок <prefix><rank> и первого p.font-bold внутри."""
+
+    def __init__(self, prefix: str):
+        super().__init__(convert_charrefs=True)
+        self.prefix = prefix
+        self.cards = []
+        self._href = None       # href текущей карточки
+        self._name = None       # собранный текст p.font-bold (None — еще не встречен)
+        self._in_name = 0       # глубина внутри p.font-bold
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href") or ""
+            if href.startswith(self.prefix):
+                self._href, self._name = href, None
+        elif self._href is not None:
+            if self._in_name:
+                if tag not in VOID_TAGS:
+                    self._in_name += 1
+            elif tag == "p" and self._name is None and _has_bold_class(attrs):
+                self._name = []
+                self._in_name = 1
+
+    def handle_endtag(self, tag):
+        if self._href is None:
+            return
+        if tag == "a":
+            self.cards.append((self._href, "".join(self._name or ())))
+            self._href, self._name, self._in_name = None, None, 0
+        elif self._in_name and tag not in VOID_TAGS:
+            self._in_name -= 1
+
+    def handle_data(self, data):
+        if self._in_name:
+            text = data.strip()
+            if text:
+                self._name.append(text)
+
+
+class _DetailsParser(HTMLParser):
+    """
+    Ищет пары <p class="font-bold">Метка</p> ... <p>Значение</p>, где значение —
+    следующий p-сосед метки (как find_next_sibling("p") в BeautifulSoup).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.pairs = []
+        self._stack = []          # (тэг, id) открытых элементов
+        self._next_id = 0
+        self._capture = None      # (id элемента, текст, это значение?, это метка?)
+        self._label = None        # (текст метки, id родителя) в ожидании значения
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        self._next_id += 1
+        parent = self._stack[-1][1] if self._stack else 0
+        self._stack.append((tag, self._next_id))
+        if tag != "p" or self._capture is not None:
+            return
+        is_value = self._label is not None and self._label[1] == parent
+        is_label = _has_bold_class(attrs)
+        if is_value or is_label:
+            self._capture = (self._next_id, [], is_value, is_label)
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        # Как и браузер, закрывающий тэг закрывает и все незакрытые вложенные;
+        # лишние закрывающие тэги игнорируются
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                break
+        else:
+            return
+        while len(self._stack) > i:
+            self._close(self._stack.pop()[1])
+
+    def _close(self, closed):
+        if self._capture is not None and self._capture[0] == closed:
+            _, parts, is_value, is_label = self._capture
+            self._capture = None
+            text = "".join(parts)
+            if is_value:
+                self.pairs.append((self._label[0], text))
+                self._label = None
+            if is_label:
+                self._label = (text, self._stack[-1][1] if self._stack else 0)
+        elif self._label is not None and closed == self._label[1]:
+            # Родитель метки закрылся — соседнего <p> со значением не будет
+            self._label = None
+
+    def handle_data(self, data):
+        if self._capture is not None:
+            text = data.strip()
+            if text:
+                self._capture[1].append(text)
+
+
+def parse_cards(html: str, prefix: str = "/classic/") -> list:
+    """Возвращает [(href, сырое имя)] для всех карточек уровней в HTML списка (ссылки с prefix)."""
+    parser = _CardsParser(prefix)
+    parser.feed(html)
+    parser.close()
+    return parser.cards
+
+
+def parse_details(html: str) -> dict:
+    """Достает length/objects/version со страницы уровня."""
+    parser = _DetailsParser()
+    parser.feed(html)
+    parser.close()
+    details = {"length": None, "objects": None, "version": None}
+    for label, value in parser.pairs:
+        label = label.lower()
+        if "length" in label: details["length"] = value
+        elif "objects" in label: details["objects"] = int(value.replace(",", ""))
+        elif "version" in label: details["version"] = value
+    return details
@@ -0,0 +1,204 @@
+# query.py
+"""
+Мини-язык запросов к списку уровней.
+
+    len >= 2m rank 1-100 objects < 200000 version 2.2 name:wave
+
+Поддерживаемые фильтры:
+  len / length   — длительность: 150, 150s, 2m, 2m30s, 2:30
+  objects / obj  — число объектов: 200000, 200,000, 200k
+  rank           — ранг или диапазон рангов: 5, 1-100, < 50
+  version / ver  — версия игры: 2.2
+  name:<текст>   — подстрока в названии (можно в кавычках: name:"tidal wave")
+  list:<список>  — только один список: classic, platformer (plat), challenge (chal);
+                   без фильтра поиск идет по всем спискам
+Операторы: >, >=, <, <=, = (или :); для len оператор > нестрогий, как и раньше
+(len > 2m30s — уровни длиной от 2:30). Слова вне фильтров ищутся в названии,
+одиночное число — ранг.
+"""
+import re
+
+from lists import LISTS, find_list
+
+
+class QueryError(ValueError):
+    """Запрос не удалось разобрать. Текст ошибки можно показать пользователю."""
+
+
+FIELD_ALIASES = {
+    "len": "duration", "length": "duration",
+    "objects": "objects", "obj": "objects", "objs": "objects",
+    "rank": "rank",
+    "version": "version", "ver": "version",
+    "name": "name",
+    "list": "list",
+}
+
+FIELD_RE = re.compile(r"(length|len|objects|objs|obj|rank|version|ver|name|list)(?![\w.])\s*(>=|<=|>|<|=|:)?\s*", re.IGNORECASE)
+
+VALUE_RES = {
+    "duration": re.compile(r"\d+\s*m\w*(?:\s*\d+\s*s\w*)?|\d+\s*s\w*|\d+:\d{1,2}|\d+(?![\w:])", re.IGNORECASE),
+    "objects": re.compile(r"\d[\d,]*k?(?!\w)", re.IGNORECASE),
+    "rank": re.compile(r"\d+\s*-\s*\d+|\d+(?!\w)"),
+    "version": re.compile(r"[\w.]+"),
+    "name": re.compile(r'"[^"]*"|\S+'),
+    "list": re.compile(r"[\w-]+"),
+}
+
+# Для этих полей допустимо только равенство
+EQUALITY_ONLY = {"version", "name", "list"}
+
+
+def parse_duration(query: str) -> int:
+    """Парсит длительность (например, '2m30s', '150', '2:30') в секунды. 0 — не распознано."""
+    query = query.strip()
+    clock = re.fullmatch(r"(\d+):(\d{1,2})", query)
+    if clock:
+        return int(clock.group(1)) * 60 + int(clock.group(2))
+
+    total_seconds = 0
+    # Ищем минуты (e.g., 2m, 5min)
+    minutes_match = re.search(r'(\d+)\s*m', query, re.IGNORECASE)
+    if minutes_match:
+        total_seconds += int(minutes_match.group(1)) * 60
+
+    # Ищем секунды (e.g., 90s, 30sec)
+    seconds_match = re.search(r'(\d+)\s*s', query, re.IGNORECASE)
+    if seconds_match:
+        total_seconds += int(seconds_match.group(1))
+
+    # Если нет 'm' или 's', считаем что это просто секунды
+    if not minutes_match and not seconds_match and query.isdigit():
+        total_seconds = int(query)
+
+    return total_seconds
+
+
+def _parse_int(field: str, value: str) -> int:
+    value = value.replace(",", "").lower()
+    if field == "duration":
+        seconds = parse_duration(value)
+        if seconds == 0:
+            raise QueryError(f"Не понял длительность '{value}'.")
+        return seconds
+    if value.endswith("k"):
+        return int(value[:-1]) * 1000
+    return int(value)
+
+
+def _op_range(op: str, value: int) -> tuple:
+    """Превращает оператор сравнения в замкнутый диапазон (None — без границы)."""
+    if op == ">":
+        return value + 1, None
+    if op == ">=":
+        return value, None
+    if op == "<":
+        return None, value - 1
+    if op == "<=":
+        return None, value
+    return value, value
+
+
+def _narrow(current, new) -> tuple:
+    """Пересечение двух диапазонов: несколько условий на одно поле складываются через И."""
+    if current is None:
+        return new
+    lows = [x for x in (current[0], new[0]) if x is not None]
+    highs = [x for x in (current[1], new[1]) if x is not None]
+    return (max(lows) if lows else None, min(highs) if highs else None)
+
+
+class LevelQuery:
+    """Разобранный запрос: набор условий, объединенных через И."""
+
+    def __init__(self, rank=None, duration=None, objects=None, version=None, name=None, list=None):
+        self.rank = rank            # (от, до) включительно, None — без границы
+        self.duration = duration    # (от, до) в секундах
+        self.objects = objects      # (от, до)
+        self.version = version      # строка версии
+        self.name = name            # подстрока названия в нижнем регистре
+        self.list = list            # имя списка (lists.LISTS), None — все списки
+
+    def __repr__(self):
+        fields = ", ".join(f"{k}={v!r}" for k, v in vars(self).items() if v is not None)
+        return f"LevelQuery({fields})"
+
+    @property
+    def is_empty(self) -> bool:
+        return all(v is None for v in vars(self).values())
+
+    @property
+    def is_name_only(self) -> bool:
+        """Только поиск по названию (возможно, в одном списке) — для таких запросов имеет смысл нечеткий поиск."""
+        return self.name is not None and all(v is None for k, v in vars(self).items() if k not in ("name", "list"))
+
+    @property
+    def kind(self) -> str:
+        """Тип запроса для метрик: имя единственного условия или 'combined'."""
+        fields = [k for k, v in vars(self).items() if v is not None]
+        return fields[0] if len(fields) == 1 else "combined"
+
+    @classmethod
+    def parse(cls, text: str) -> "LevelQuery":
+        query = cls()
+        words = []
+        pos = 0
+        text = text.strip()
+        while pos < len(text):
+            if text[pos].isspace():
+                pos += 1
+                continue
+
+            match = FIELD_RE.match(text, pos)
+            value_match = None
+            if match:
+                field = FIELD_ALIASES[match.group(1).lower()]
+                op = match.group(2)
+                value_match = VALUE_RES[field].match(text, match.end())
+                if field == "list" and value_match is not None and find_list(value_match.group(0)) is None:
+                    if op:
+                        raise QueryError(f"Неизвестный список '{value_match.group(0)}'. Доступны: {', '.join(LISTS)}.")
+                    value_match = None  # "list" без оператора и без имени списка — слово из названия
+                if value_match is None and op and op != ":":
+                    raise QueryError(f"После '{match.group(1)} {op}' ожидалось значение.")
+
+            if value_match is None:
+                # Не фильтр — обычное слово из названия
+                end = pos
+                while end < len(text) and not text[end].isspace():
+                    end += 1
+                words.append(text[pos:end])
+                pos = end
+                continue
+
+            if field in EQUALITY_ONLY and op not in (None, "=", ":"):
+                raise QueryError(f"Для '{match.group(1)}' поддерживается только равенство.")
+            query._apply(field, op, value_match.group(0))
+            pos = value_match.end()
+
+        if words:
+            phrase = " ".join(words).lower()
+            only_list = all(v is None for k, v in vars(query).items() if k != "list")
+            if len(words) == 1 and phrase.isdigit() and only_list:
+                query.rank = (int(phrase), int(phrase))
+            else:
+                query.name = f"{query.name} {phrase}" if query.name else phrase
+        return query
+
+    def _apply(self, field: str, op: str, value: str):
+        if field == "name":
+            value = value.strip('"').lower()
+            self.name = f"{self.name} {value}" if self.name else value
+        elif field == "version":
+            self.version = value
+        elif field == "list":
+            self.list = find_list(value)
+        elif field == "rank" and "-" in value:
+            low, high = (int(x) for x in value.split("-"))
+            self.rank = _narrow(self.rank, (min(low, high), max(low, high)))
+        else:
+            if field == "duration" and op == ">":
+                # Исторически "len > 2m30s" находил уровни длиннее или равные 2:30 — так и оставляем
+                op = ">="
+            bounds = _op_range(op, _parse_int(field, value))
+            setattr(self, field, _narrow(getattr(self, field), bounds))
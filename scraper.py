@@ -1,130 +1,530 @@
 # scraper/scraper.py
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
-from bs4 import BeautifulSoup
-import json, re, time, os
-from urllib.parse import urljoin
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightAsyncTimeoutError
+import asyncio, json, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import metrics
 import settings
+from http_scraper import HttpFetcher
+from storage import Checkpoint, atomic_write_json
+from search import LevelSearch
+from snapshot import snapshot_path_for, write_snapshot
+from parsers import CARDS_EVAL_JS, parse_details
+from lists import get_list, level_sort_key, list_of
 
-class DemonlistScraper:
-    def __init__(self):
+PHASE_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+PHASE_SECONDS = metrics.histogram("scraper_phase_seconds", "Длительность фаз скрапера по спискам", ("phase", "list"),
+                                  PHASE_BUCKETS)
+PAGES = metrics.counter("scraper_pages_total", "Страницы уровней по исходу: ok, timeout, error, parse_error",
+                        ("backend", "result"))
+PAGES_PER_SECOND = metrics.gauge("scraper_pages_per_second", "Скорость сбора деталей в последнем прогоне", ("backend", "list"))
+LEVELS_FOUND = metrics.gauge("scraper_levels", "Уровней в собранном списке", ("list",))
+RESUMED = metrics.gauge("scraper_resumed_levels", "Уровней, взятых из журнала прерванного прогона", ("list",))
+FAILED = metrics.gauge("scraper_failed_levels", "Уровней без деталей после всех повторов")
+FAILED_LISTS = metrics.gauge("scraper_failed_lists", "Списков, которые не удалось собрать целиком")
+
+# Резолвится, когда карточек стало больше prev и DOM не менялся quiet мс,
+# либо по общему тайм-ауту. Возвращает текущее число карточек.
+WAIT_FOR_NEW_CARDS_JS = """
+([sel, prev, timeout, quiet]) => new Promise(resolve => {
+    const count = () => document.querySelectorAll(sel).length;
+    let quietTimer = null;
+    const finish = () => {
+        observer.disconnect();
+        clearTimeout(deadline);
+        clearTimeout(quietTimer);
+        resolve(count());
+    };
+    const arm = () => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(finish, quiet);
+    };
+    const observer = new MutationObserver(() => { if (count() > prev) arm(); });
+    observer.observe(document.body, {childList: true, subtree: true});
+    const deadline = setTimeout(finish, timeout);
+    if (count() > prev) arm();
+})
+"""
+
+class ListScraper:
+    """Сбор одного списка Demonlist: страница списка, затем детали каждого уровня."""
+
+    def __init__(self, extractor, base_url: str = settings.BASE_URL, checkpoint=None, previous=()):
+        self.extractor = extractor  # ListExtractor, см. lists.py
+        self.name = extractor.name
+        self.base_url = base_url
+        self.list_url = extractor.url(base_url)
         self.data = []
         self.browser = None
         self.page = None
+        self.checkpoint = checkpoint  # общий Checkpoint прогона
+        self.previous = list(previous)  # уровни этого списка из прошлого JSON
 
-    def _safe_extract_name(self, text: str) -> str:
-        text = text.strip()
-        return text.split("-", 1)[1].strip() if "-" in text else text
+    def _log(self, text: str):
+        # Списки собираются параллельно — каждая строка помечена своим списком
+        print(f"[{self.name}] {text}")
 
     def _open_site(self, playwright):
-        print("🌐 Открываю сайт Demonlist.org...")
+        self._log(f"🌐 Открываю список {self.extractor.title} на Demonlist.org...")
         self.browser = playwright.chromium.launch(headless=settings.HEADLESS)
         self.page = self.browser.new_page()
-        self.page.goto(settings.BASE_URL, wait_until="domcontentloaded", timeout=settings.PAGE_LOAD_TIMEOUT)
-        self.page.wait_for_selector('div.w-\\[90\\%\\].mx-auto.grid.justify-items-center', timeout=settings.SELECTOR_TIMEOUT)
-        time.sleep(2)
+        self.page.goto(self.list_url, wait_until="domcontentloaded", timeout=settings.PAGE_LOAD_TIMEOUT)
+        self.page.wait_for_selector(self.extractor.container_selector, timeout=settings.SELECTOR_TIMEOUT)
+        self.page.wait_for_selector(self.extractor.card_selector, timeout=settings.SELECTOR_TIMEOUT)
+
+    def _card_count(self) -> int:
+        return self.page.evaluate("(sel) => document.querySelectorAll(sel).length", self.extractor.card_selector)
+
+    def _wait_for_new_cards(self, prev_count: int) -> int:
+        """
+        Ждет, пока MutationObserver не увидит новые карточки и DOM не успокоится
+        на SCROLL_PAUSE секунд. Возвращает новое число карточек (или старое,
+        если за MAX_WAIT_FOR_NEW секунд ничего не появилось).
+        """
+        return self.page.evaluate(WAIT_FOR_NEW_CARDS_JS, [
+            self.extractor.card_selector, prev_count,
+            int(settings.MAX_WAIT_FOR_NEW * 1000), int(settings.SCROLL_PAUSE * 1000),
+        ])
 
     def _reanimate_scroll(self):
         """'Раскачивает' страницу, если она перестала подгружать контент."""
-        print("😴 Похоже, ленивая загрузка 'уснула'. Пробуем ее разбудить...")
+        self._log("😴 Похоже, ленивая загрузка 'уснула'. Пробуем ее разбудить...")
         self.page.evaluate("window.scrollBy(0, -500);")
-        time.sleep(0.5)
-        self.page.evaluate("window.scrollBy(0, document.body.scrollHeight);")
-        time.sleep(1)
+        self.page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
 
     def _smart_scroll(self):
         """
-        Умный скролл, который ждет подгрузки нового контента и борется с 'засыпанием' страницы.
+        Умный скролл: после каждой прокрутки ждет изменений DOM вместо фиксированных пауз
+        и останавливается, как только список закончился.
         """
-        print("📜 Начинаю умный скролл для загрузки всех уровней...")
-        prev_count = self.page.evaluate("() => document.querySelectorAll('a[href^=\"/classic/\"]').length")
+        self._log("📜 Начинаю умный скролл для загрузки всех уровней...")
+        prev_count = self._card_count()
         no_new_attempts = 0
 
-        while no_new_attempts < settings.MAX_NO_NEW_ATTEMPTS:
-            # Делаем несколько быстрых скроллов
-            for _ in range(settings.FAST_SCROLLS_PER_STEP):
-                self.page.evaluate("window.scrollBy(0, document.body.scrollHeight)")
-                time.sleep(0.3)
-
-            # Терпеливо ждем появления нового контента
-            start_time = time.time()
-            found_new_in_cycle = False
-            while time.time() - start_time < settings.MAX_WAIT_FOR_NEW:
-                time.sleep(settings.SCROLL_PAUSE)
-                new_count = self.page.evaluate("() => document.querySelectorAll('a[href^=\"/classic/\"]').length")
-                if new_count > prev_count:
-                    print(f"🔽 Найдено карточек: {new_count}")
-                    prev_count = new_count
-                    no_new_attempts = 0  # Сбрасываем счетчик неудач
-                    found_new_in_cycle = True
-                    break # Выходим из цикла ожидания
-
-            # Если за все время ожидания ничего не появилось
-            if not found_new_in_cycle:
-                no_new_attempts += 1
-                print(f"⏱ Нет новых карточек ({no_new_attempts}/{settings.MAX_NO_NEW_ATTEMPTS})")
-                self._reanimate_scroll() # Пытаемся "разбудить" страницу
-        
-        print(f"✅ Скролл завершён. Всего найдено {prev_count} карточек.")
-
-
-    def _extract_levels_list(self):
-        html = self.page.content()
-        soup = BeautifulSoup(html, "html.parser")
-        cards = soup.select('a[href^="/classic/"]')
-        pattern = re.compile(r"/classic/(\d+)")
-        for card in cards:
-            href = card.get("href", "")
-            match = pattern.search(href)
-            if not match: continue
-            rank = int(match.group(1))
-            name_tag = card.select_one("p.font-bold")
-            name_raw = name_tag.get_text(strip=True) if name_tag else ""
-            self.data.append({"rank": rank, "name": self._safe_extract_name(name_raw), "link": urljoin(settings.BASE_URL, href)})
-        self.data.sort(key=lambda x: x["rank"])
-        print(f"🧩 Извлечено {len(self.data)} уровней из основного списка.")
-
-    def _parse_level_details(self, soup: BeautifulSoup) -> dict:
-        details = {"length": None, "objects": None, "version": None}
-        label_tags = soup.find_all("p", class_="font-bold")
-        for tag in label_tags:
-            label_text = tag.get_text(strip=True).lower()
-            value_tag = tag.find_next_sibling("p")
-            if value_tag:
-                value_text = value_tag.get_text(strip=True)
-                if "length" in label_text: details["length"] = value_text
-                elif "objects" in label_text: details["objects"] = int(value_text.replace(",", ""))
-                elif "version" in label_text: details["version"] = value_text
-        return details
-
-    def _scrape_all_details(self):
-        print("\n🔎 Начинаю сбор детальной информации по каждому уровню (это займет время)...")
-        for i, level in enumerate(self.data):
+        for _ in range(settings.MAX_SCROLL_ROUNDS):
+            self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            new_count = self._wait_for_new_cards(prev_count)
+            if new_count > prev_count:
+                self._log(f"🔽 Найдено карточек: {new_count}")
+                prev_count = new_count
+                no_new_attempts = 0
+                continue
+
+            # Карточки приходят пачками по STUCK_CARD_MULTIPLE. Неполная пачка — конец списка,
+            # но одно тихое окно может прийтись на медленную подгрузку, поэтому ждем еще раунд.
+            no_new_attempts += 1
+            if prev_count % settings.STUCK_CARD_MULTIPLE != 0 and no_new_attempts >= 2:
+                break
+
+            self._log(f"⏱ Нет новых карточек ({no_new_attempts}/{settings.MAX_NO_NEW_ATTEMPTS})")
+            if no_new_attempts >= settings.MAX_NO_NEW_ATTEMPTS:
+                break
+            self._reanimate_scroll()  # Пытаемся "разбудить" страницу
+        else:
+            self._log(f"⚠️ Достигнут лимит раундов скролла ({settings.MAX_SCROLL_ROUNDS}).")
+
+        self._log(f"✅ Скролл завершён. Всего найдено {prev_count} карточек.")
+
+
+    def _extract_levels_list(self, html: str = None):
+        """
+        Без html карточки читаются прямо в браузере одним $$eval;
+        с html (HTTP-бэкенд) — однопроходным парсером.
+        """
+        if html is None:
+            cards = [(c["href"], c["name"]) for c in self.page.eval_on_selector_all(self.extractor.card_selector, CARDS_EVAL_JS)]
+        else:
+            cards = self.extractor.parse_cards(html)
+        self.data = self.extractor.build_levels(cards, self.base_url)
+        LEVELS_FOUND.set(len(self.data), list=self.name)
+        self._log(f"🧩 Извлечено {len(self.data)} уровней из списка.")
+
+    def _parse_level_details(self, html: str) -> dict:
+        return parse_details(html)
+
+    def _is_fresh(self, level: dict, now: datetime) -> bool:
+        scraped_at = level.get("scraped_at")
+        if not scraped_at or level.get("length") is None:
+            return False
+        try:
+            age = now - datetime.fromisoformat(scraped_at)
+        except (TypeError, ValueError):
+            return False
+        return age <= timedelta(days=settings.DETAILS_MAX_AGE_DAYS)
+
+    def _plan_incremental(self, refetch_all: bool = False) -> list:
+        """
+        Переносит детали из прошлого JSON в свежий список уровней и возвращает
+        уровни, которые нужно перескачать: новые, сдвинувшиеся или с устаревшими
+        деталями (refetch_all — все). Прошлые детали получают и перескачиваемые
+        уровни: если обновить их не удастся, в JSON останутся старые, а не пустые.
+        """
+        by_link, by_name = {}, {}
+        for level in self.previous:
+            by_link[level.get("link")] = level
+            by_name.setdefault(level.get("name"), level)
+
+        now = datetime.now(timezone.utc)
+        pending = []
+        new = moved = stale = 0
+        for level in self.data:
+            # Сначала ищем тот же уровень на той же позиции, затем по имени
+            # (одинаковые названия в списке встречаются)
+            old = by_link.get(level["link"])
+            if old is None or old.get("name") != level["name"]:
+                old = by_name.get(level["name"])
+            if old is None:
+                new += 1
+            else:
+                for key in ("length", "objects", "version", "scraped_at"):
+                    level[key] = old.get(key)
+                if old.get("link") != level["link"]:
+                    moved += 1
+                elif not self._is_fresh(old, now):
+                    stale += 1
+                elif not refetch_all:
+                    continue
+            pending.append(level)
+
+        if not refetch_all:
+            self._log(f"♻️ Инкрементальный режим: новых {new}, сдвинулось {moved}, устарело {stale}, "
+                  f"без изменений {len(self.data) - len(pending)}")
+        return pending
+
+    def _apply_details(self, level: dict, details: dict):
+        level.update(details)
+        level["scraped_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        if self.checkpoint is not None:
+            self.checkpoint.record(level)
+
+    def _resume(self, pending: list) -> list:
+        """Берет детали из журнала прерванного прогона и возвращает только еще не собранные уровни."""
+        records = self.checkpoint.load() if self.checkpoint is not None else {}
+        if not records:
+            return pending
+        now = datetime.now(timezone.utc)
+        left = []
+        for level in pending:
+            record = records.get(Checkpoint.key(level))
+            if record is not None and self._is_fresh(record, now):
+                for key in ("length", "objects", "version", "scraped_at"):
+                    level[key] = record.get(key)
+            else:
+                left.append(level)
+        RESUMED.set(len(pending) - len(left), list=self.name)
+        self._log(f"⏯️ Продолжаю прерванный прогон: из журнала взято {len(pending) - len(left)} уровней, "
+              f"осталось {len(left)}")
+        return left
+
+    def _pending(self, incremental: bool) -> list:
+        pending = self._plan_incremental(refetch_all=not incremental)
+        return self._resume(pending)
+
+    def _scrape_all_details(self, levels: list = None):
+        """Последовательный сбор на одной вкладке. Возвращает [(уровень, причина)] для упавших."""
+        self._log("🔎 Начинаю сбор детальной информации по каждому уровню (это займет время)...")
+        levels = self.data if levels is None else levels
+        started = time.time()
+        failed = []
+        for i, level in enumerate(levels):
             link = level.get("link")
-            print(f"[{i+1}/{len(self.data)}] Загружаю: #{level['rank']} {level['name']}")
+            self._log(f"[{i+1}/{len(levels)}] Загружаю: #{level['rank']} {level['name']}")
             try:
                 self.page.goto(link, wait_until="domcontentloaded", timeout=settings.PAGE_LOAD_TIMEOUT)
                 # Увеличиваем таймаут ожидания селектора, чтобы дать странице больше времени
-                self.page.wait_for_selector('p.font-bold', timeout=15000)
+                self.page.wait_for_selector('p.font-bold', timeout=settings.DETAIL_SELECTOR_TIMEOUT)
                 # Даем еще полсекунды на всякий случай, если есть какие-то анимации
-                time.sleep(0.5)
-                details = self._parse_level_details(BeautifulSoup(self.page.content(), "html.parser"))
-                level.update(details)
+                time.sleep(settings.DETAIL_SETTLE_DELAY)
+                details = self._parse_level_details(self.page.content())
+                self._apply_details(level, details)
+                PAGES.inc(backend="playwright", result="ok")
             except PlaywrightTimeoutError:
-                print(f"❌ Тайм-аут при загрузке страницы для уровня #{level['rank']}. Пропускаю.")
+                PAGES.inc(backend="playwright", result="timeout")
+                self._log(f"❌ Тайм-аут при загрузке страницы для уровня #{level['rank']}. Отложен на повтор.")
+                failed.append((level, "тайм-аут"))
             except Exception as e:
-                print(f"❌ Ошибка при обработке уровня #{level['rank']}: {e}")
+                PAGES.inc(backend="playwright", result="error")
+                self._log(f"❌ Ошибка при обработке уровня #{level['rank']}: {e}")
+                failed.append((level, str(e)))
+        self._report_throughput(len(levels), time.time() - started, "playwright")
+        return failed
 
-    def _save(self):
-        os.makedirs(os.path.dirname(settings.OUTPUT_FILE), exist_ok=True)
-        with open(settings.OUTPUT_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=2)
-        print(f"\n💾 Данные сохранены в {settings.OUTPUT_FILE}")
+    async def _scrape_all_details_concurrent(self, concurrency: int, levels: list = None):
+        """
+        Параллельный сбор деталей: страницы уровней раскидываются по пулу вкладок
+        async Playwright. Результат совпадает с последовательным _scrape_all_details.
+        """
+        self._log(f"🔎 Начинаю параллельный сбор деталей ({concurrency} вкладок)...")
+        levels = self.data if levels is None else levels
+        started = time.time()
+        total = len(levels)
+        done = 0
+        failed = []
+
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=settings.HEADLESS)
+            # Пул вкладок: каждая задача берет свободную вкладку и возвращает ее обратно,
+            # так что одновременно открыто не больше concurrency страниц.
+            pages = asyncio.Queue()
+            for _ in range(concurrency):
+                context = await browser.new_context()
+                pages.put_nowait(await context.new_page())
+
+            async def scrape_one(level):
+                nonlocal done
+                page = await pages.get()
+                try:
+                    await page.goto(level["link"], wait_until="domcontentloaded", timeout=settings.PAGE_LOAD_TIMEOUT)
+                    await page.wait_for_selector('p.font-bold', timeout=settings.DETAIL_SELECTOR_TIMEOUT)
+                    await asyncio.sleep(settings.DETAIL_SETTLE_DELAY)
+                    html = await page.content()
+                    self._apply_details(level, self._parse_level_details(html))
+                    PAGES.inc(backend="playwright", result="ok")
+                    done += 1
+                    self._log(f"[{done}/{total}] Готово: #{level['rank']} {level['name']}")
+                except PlaywrightAsyncTimeoutError:
+                    PAGES.inc(backend="playwright", result="timeout")
+                    self._log(f"❌ Тайм-аут при загрузке страницы для уровня #{level['rank']}. Отложен на повтор.")
+                    failed.append((level, "тайм-аут"))
+                except Exception as e:
+                    PAGES.inc(backend="playwright", result="error")
+                    self._log(f"❌ Ошибка при обработке уровня #{level['rank']}: {e}")
+                    failed.append((level, str(e)))
+                finally:
+                    pages.put_nowait(page)
+
+            await asyncio.gather(*(scrape_one(level) for level in levels))
+            await browser.close()
+
+        self._report_throughput(total, time.time() - started, "playwright")
+        return failed
+
+    def _retry_failed(self, failed: list, concurrency: int) -> list:
+        """
+        Очередь повторов после основного прохода: упавшие уровни перескачиваются
+        через Playwright, пауза перед каждой попыткой растет экспоненциально.
+        Возвращает [(уровень, причина)], которые так и не удалось собрать.
+        """
+        for attempt in range(1, settings.SCRAPE_RETRIES + 1):
+            if not failed:
+                break
+            delay = settings.SCRAPE_RETRY_BACKOFF * 2 ** (attempt - 1)
+            self._log(f"🔁 Повтор {attempt}/{settings.SCRAPE_RETRIES}: {len(failed)} уровней через {delay} с...")
+            time.sleep(delay)
+            levels = [level for level, _ in failed]
+            with PHASE_SECONDS.time(phase="retry", list=self.name):
+                failed = asyncio.run(self._scrape_all_details_concurrent(min(max(concurrency, 1), len(levels)), levels))
+        return failed
+
+    def _report_throughput(self, count: int, elapsed: float, backend: str):
+        rate = count / elapsed if elapsed > 0 else 0.0
+        PAGES_PER_SECOND.set(rate, backend=backend, list=self.name)
+        self._log(f"⚡ Обработано {count} уровней за {elapsed:.1f} с ({rate:.2f} уровн./с)")
+
+    def _run_http(self, incremental: bool):
+        """
+        Быстрый путь без браузера: список и страницы уровней качаются по HTTP.
+        Возвращает [(уровень, причина)] для неразобранных (их добирает Playwright),
+        или None, если серверный HTML не содержит полного списка.
+        """
+        fetcher = HttpFetcher(self.base_url)
+        try:
+            try:
+                with PHASE_SECONDS.time(phase="http_list", list=self.name):
+                    self._extract_levels_list(fetcher.fetch(self.list_url))
+            except Exception as e:
+                self._log(f"⚠️ HTTP: не удалось получить список уровней: {e}")
+                return None
+            # Пустой список или ровно целое число пачек — признак того, что сервер
+            # отдал только первую порцию ленивой подгрузки
+            if not self.data or len(self.data) % settings.STUCK_CARD_MULTIPLE == 0:
+                self._log("⚠️ HTTP: серверный HTML не содержит полного списка, переключаюсь на Playwright.")
+                self.data = []
+                return None
+            # Неполная пачка другого размера выглядит как конец списка — сверяемся с прошлым прогоном
+            if len(self.data) < len(self.previous) * settings.HTTP_MIN_LIST_RATIO:
+                self._log(f"⚠️ HTTP: в списке {len(self.data)} уровней против {len(self.previous)} в прошлый раз, "
+                          f"переключаюсь на Playwright.")
+                self.data = []
+                return None
+
+            pending = self._pending(incremental)
+            started = time.time()
+            failed = []
+            with PHASE_SECONDS.time(phase="http_details", list=self.name):
+                for level, html in zip(pending, fetcher.fetch_many([level["link"] for level in pending])):
+                    if isinstance(html, Exception):
+                        PAGES.inc(backend="http", result="error")
+                        self._log(f"❌ HTTP: ошибка при загрузке уровня #{level['rank']}: {html}")
+                        failed.append((level, str(html)))
+                        continue
+                    try:
+                        details = self._parse_level_details(html)
+                    except Exception as e:
+                        # Например, нечисловое значение Objects — уровень уйдет в Playwright и повторы
+                        PAGES.inc(backend="http", result="parse_error")
+                        self._log(f"❌ HTTP: не удалось разобрать уровень #{level['rank']}: {e}")
+                        failed.append((level, f"ошибка разбора: {e}"))
+                        continue
+                    if details["length"] is None:
+                        PAGES.inc(backend="http", result="parse_error")
+                        failed.append((level, "в HTML нет деталей"))
+                        continue
+                    self._apply_details(level, details)
+                    PAGES.inc(backend="http", result="ok")
+            self._report_throughput(len(pending), time.time() - started, "http")
+            return failed
+        finally:
+            fetcher.close()
+
+    def run(self, concurrency: int, incremental: bool, backend: str):
+        """Собирает список и детали его уровней в self.data. Возвращает [(уровень, причина)] для несобранных."""
+        if backend == "http":
+            failed = self._run_http(incremental)
+            if failed is not None:
+                if failed:
+                    self._log(f"🔁 {len(failed)} уровней не разобрались по HTTP, добираю через Playwright...")
+                    with PHASE_SECONDS.time(phase="details", list=self.name):
+                        levels = [level for level, _ in failed]
+                        failed = asyncio.run(self._scrape_all_details_concurrent(max(concurrency, 1), levels))
+                return self._retry_failed(failed, concurrency)
 
-    def run(self):
         with sync_playwright() as p:
-            self._open_site(p)
-            self._smart_scroll()
-            self._extract_levels_list()
-            self._scrape_all_details()
+            with PHASE_SECONDS.time(phase="open", list=self.name):
+                self._open_site(p)
+            with PHASE_SECONDS.time(phase="scroll", list=self.name):
+                self._smart_scroll()
+            with PHASE_SECONDS.time(phase="list", list=self.name):
+                self._extract_levels_list()
+            if len(self.data) < len(self.previous) * settings.HTTP_MIN_LIST_RATIO:
+                self.browser.close()
+                raise RuntimeError(f"в списке {len(self.data)} уровней против {len(self.previous)} "
+                                   f"в прошлый раз, похоже, он загрузился не полностью")
+            pending = self._pending(incremental)
+            failed = []
+            if concurrency <= 1 and pending:
+                with PHASE_SECONDS.time(phase="details", list=self.name):
+                    failed = self._scrape_all_details(pending)
             self.browser.close()
-        self._save()
\ No newline at end of file
+        # async Playwright нельзя запускать внутри sync_playwright, поэтому
+        # параллельный сбор и повторы идут уже после закрытия основного браузера
+        if concurrency > 1 and pending:
+            with PHASE_SECONDS.time(phase="details", list=self.name):
+                failed = asyncio.run(self._scrape_all_details_concurrent(concurrency, pending))
+        return self._retry_failed(failed, concurrency)
+
+
+class DemonlistScraper:
+    """
+    Собирает несколько списков Demonlist параллельно (по потоку на список, см. ListScraper)
+    и сохраняет их в один OUTPUT_FILE: уровень задается парой (list, rank).
+    """
+
+    def __init__(self, base_url: str = settings.BASE_URL, lists=None):
+        self.base_url = base_url
+        self.lists = [get_list(name) for name in (lists or settings.SCRAPE_LISTS)]
+        self.data = []
+        self.checkpoint = None  # Checkpoint текущего прогона, общий для всех списков
+        self.failed_lists = {}  # список -> причина, если он не собран целиком
+
+    def _load_previous(self) -> list:
+        """Читает прошлый результат скрапинга, если он есть."""
+        try:
+            with open(settings.OUTPUT_FILE, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def _report_failed(self, failed: list):
+        FAILED.set(len(failed))
+        FAILED_LISTS.set(len(self.failed_lists))
+        if self.failed_lists:
+            print(f"\n❌ Не удалось собрать списков: {len(self.failed_lists)} (в файле остались прошлые версии):")
+            for name, reason in self.failed_lists.items():
+                print(f"  {name} — {reason}")
+        if not failed:
+            return
+        print(f"\n⚠️ Не удалось собрать детали {len(failed)} уровней (после {settings.SCRAPE_RETRIES} повторов):")
+        for level, reason in sorted(failed, key=lambda item: level_sort_key(item[0])):
+            print(f"  [{level['list']}] #{level['rank']} {level['name']} — {reason}")
+
+    def _save(self):
+        atomic_write_json(settings.OUTPUT_FILE, self.data, indent=2)
+        snapshot_path = snapshot_path_for(settings.OUTPUT_FILE)
+        write_snapshot(LevelSearch([dict(level) for level in self.data]), snapshot_path, source=settings.OUTPUT_FILE)
+        print(f"\n💾 Данные сохранены в {settings.OUTPUT_FILE} (снимок: {snapshot_path})")
+
+    def run(self, concurrency: int = None, incremental: bool = None, backend: str = None):
+        """
+        concurrency — сколько вкладок использовать для деталей уровней каждого списка.
+        1 — старый последовательный режим на одной вкладке.
+        incremental — перескачивать детали только новых, сдвинувшихся
+        и устаревших уровней, остальное взять из прошлого JSON.
+        backend — "http" (без браузера, с откатом на Playwright) или "playwright".
+        Списки из self.lists собираются одновременно (до LIST_CONCURRENCY); список, который
+        не удалось собрать, остается в файле в прошлой версии и попадает в self.failed_lists.
+        Если не собран ни один список, файл не меняется и выбрасывается RuntimeError.
+        Собранные детали сразу пишутся в журнал CHECKPOINT_FILE: после падения
+        следующий запуск их не перекачивает. Упавшие уровни повторяются в конце.
+        Возвращает [(уровень, причина)] для уровней, которые так и не собрались.
+        Метрики прогона доступны на SCRAPER_METRICS_PORT и в конце пишутся в SCRAPER_METRICS_FILE.
+        """
+        server = metrics.start_metrics_server(settings.SCRAPER_METRICS_PORT)
+        self.checkpoint = Checkpoint(settings.CHECKPOINT_FILE)
+        try:
+            with PHASE_SECONDS.time(phase="total", list="all"):
+                failed = self._run(concurrency, incremental, backend)
+            # Сохраненным спискам журнал больше не нужен; записи упавших списков
+            # остаются, чтобы следующий запуск продолжил с того же места
+            failed_lists = set(self.failed_lists)
+            self.checkpoint.retain(lambda record: list_of(record) in failed_lists)
+            self._report_failed(failed)
+            if len(self.failed_lists) == len(self.lists):
+                raise RuntimeError("не удалось собрать ни одного списка, файл данных не изменен")
+            return failed
+        finally:
+            self.checkpoint.close()
+            self.checkpoint = None
+            metrics.REGISTRY.write_textfile(settings.SCRAPER_METRICS_FILE)
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+    def _run(self, concurrency, incremental, backend):
+        concurrency = concurrency or settings.DETAIL_CONCURRENCY
+        if incremental is None:
+            incremental = settings.INCREMENTAL_SCRAPE
+        backend = backend or settings.SCRAPER_BACKEND
+
+        previous = self._load_previous()
+        scrapers = [
+            ListScraper(extractor, self.base_url, self.checkpoint,
+                        [level for level in previous if list_of(level) == extractor.name])
+            for extractor in self.lists
+        ]
+        failed, scraped = [], {}
+        self.failed_lists = {}
+        workers = max(1, min(settings.LIST_CONCURRENCY, len(scrapers)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="list") as pool:
+            futures = [(scraper, pool.submit(scraper.run, concurrency, incremental, backend)) for scraper in scrapers]
+            for scraper, future in futures:
+                try:
+                    failed += future.result()
+                except Exception as e:
+                    print(f"❌ Список {scraper.name} не собран, в файле остается прошлая версия: {e}")
+                    self.failed_lists[scraper.name] = str(e) or type(e).__name__
+                    continue
+                if scraper.data:
+                    scraped[scraper.name] = scraper.data
+                else:
+                    self.failed_lists[scraper.name] = "пустой список"
+
+        if not scraped:
+            return failed
+        # Несобранные списки (и списки, которых нет в self.lists) берутся из прошлого файла
+        kept = [dict(level, list=list_of(level)) for level in previous if list_of(level) not in scraped]
+        self.data = sorted(kept + [level for levels in scraped.values() for level in levels], key=level_sort_key)
+        with PHASE_SECONDS.time(phase="save", list="all"):
+            self._save()
+        return failed
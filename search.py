@@ -1,20 +1,33 @@
 # search.py
+import copy
 import json
-import re
+from bisect import bisect_left, bisect_right
+from itertools import chain
 import settings
+from lists import level_sort_key, list_of, list_order, list_title
+from query import LevelQuery, QueryError, parse_duration
 import requests
-import os
+from snapshot import Snapshot, SnapshotError, snapshot_path_for, write_snapshot
+from sync import sync_dataset
 
 class LevelSearch:
-    """Класс для поиска уровней по имени, рангу и длительности."""
+    """
+    Класс для поиска уровней по имени, рангу и длительности. Все списки (classic,
+    platformer...) лежат в одних колонках и индексах; уровень задается парой (list, rank).
+    """
 
     def __init__(self, data):
         self.data = self._process_data(data)
+        self._build_indexes()
 
     def _process_data(self, raw_data):
-        """Обрабатывает сырые данные, конвертируя 'length' в секунды."""
+        """
+        Обрабатывает сырые данные, конвертируя 'length' в секунды. Результат упорядочен
+        по спискам (lists.LISTS), внутри списка — по рангу.
+        """
         processed = []
         for level in raw_data:
+            level["list"] = list_of(level)
             length_str = level.get("length")
             if length_str and ':' in length_str:
                 try:
@@ -25,8 +38,136 @@ class LevelSearch:
             else:
                 level['duration_seconds'] = 0
             processed.append(level)
+        processed.sort(key=level_sort_key)
         return processed
 
+    @staticmethod
+    def _trigrams(text: str) -> set:
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    @classmethod
+    def _padded_trigrams(cls, text: str) -> set:
+        """Триграммы с отступами по краям: начало и конец слова тоже дают триграммы."""
+        return cls._trigrams(f"  {text} ")
+
+    def _build_indexes(self):
+        """
+        Строит индексы один раз при загрузке. Все индексы хранят позиции в self.data,
+        а self.data отсортирован по (список, ранг), поэтому отсортированные позиции = порядок выдачи.
+        """
+        # Колонки по позициям: проверки условий идут по ним, без обращения к словарям.
+        # Каждый список занимает непрерывный отрезок позиций (_list_bounds), ранги в нем
+        # отсортированы, так что _ranks в границах списка служит индексом ранг -> позиция (bisect).
+        self._lists = [lvl["list"] for lvl in self.data]
+        self._list_bounds = self._group_bounds(self._lists)
+        self._ranks = [lvl["rank"] for lvl in self.data]
+        self._duration_col = [lvl["duration_seconds"] for lvl in self.data]
+        self._objects_col = [lvl["objects"] if lvl.get("objects") is not None else -1 for lvl in self.data]
+        self._version_col = [lvl.get("version") for lvl in self.data]
+        self._version_index = None  # строится при первом запросе по версии
+
+        # Позиции, упорядоченные по длительности, и сами длительности для bisect
+        self._duration_order = sorted(range(len(self.data)), key=self._duration_col.__getitem__)
+        self._durations = [self._duration_col[i] for i in self._duration_order]
+
+        # То же для числа объектов (уровни без данных, -1, не попадают в индекс)
+        with_objects = [i for i, objects in enumerate(self._objects_col) if objects >= 0]
+        self._objects_order = sorted(with_objects, key=self._objects_col.__getitem__)
+        self._objects = [self._objects_col[i] for i in self._objects_order]
+
+        # Названия в нижнем регистре и триграммный индекс (с отступами по краям) —
+        # общий для поиска подстрок и нечеткого поиска
+        self._names_low = [lvl["name"].lower() for lvl in self.data]
+        self._trigram_index = {}
+        self._gram_counts = []
+        for pos, name in enumerate(self._names_low):
+            grams = self._padded_trigrams(name)
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._trigram_index.setdefault(gram, set()).add(pos)
+
+    def _levels_at(self, positions) -> list:
+        return [self.data[i] for i in sorted(positions)]
+
+    @staticmethod
+    def _group_bounds(column) -> dict:
+        """{значение: (lo, hi)} для колонки, где одинаковые значения идут подряд."""
+        bounds = {}
+        start = 0
+        for pos in range(1, len(column) + 1):
+            if pos == len(column) or column[pos] != column[start]:
+                bounds[column[start]] = (start, pos)
+                start = pos
+        return bounds
+
+    def _list_spans(self, list_name=None) -> list:
+        """Отрезки позиций [(lo, hi)] одного списка или всех списков по порядку."""
+        if list_name is None:
+            return list(self._list_bounds.values())
+        span = self._list_bounds.get(list_name)
+        return [span] if span is not None else []
+
+    def _rank_position(self, rank: int, list_name: str = settings.DEFAULT_LIST):
+        lo, hi = self._list_bounds.get(list_name, (0, 0))
+        pos = bisect_left(self._ranks, rank, lo, hi)
+        if pos < hi and self._ranks[pos] == rank:
+            return pos
+        return None
+
+    def _cursor_position(self, cursor) -> int:
+        """Позиция курсора (список, ранг): первый уровень этого списка с рангом >= ранга курсора."""
+        list_name, rank = cursor
+        span = self._list_bounds.get(list_name)
+        if span is not None:
+            return bisect_left(self._ranks, rank, *span)
+        # Списка больше нет в данных — курсор встает на его место в порядке списков
+        order = list_order(list_name), list_name
+        for name, (lo, _) in self._list_bounds.items():
+            if (list_order(name), name) > order:
+                return lo
+        return len(self.data)
+
+    def _version_positions(self, version) -> list:
+        if self._version_index is None:
+            index = {}
+            for pos, value in enumerate(self._version_col):
+                index.setdefault(value, []).append(pos)
+            self._version_index = index
+        return self._version_index.get(version, [])
+
+    def _name_candidates(self, query_low: str):
+        """Позиции-кандидаты по триграммам (без проверки подстроки) или None для коротких запросов."""
+        grams = self._trigrams(query_low)
+        if not grams:
+            return None
+        # Пересекаем списки позиций начиная с самого короткого
+        postings = sorted((self._trigram_index.get(g, set()) for g in grams), key=len)
+        return set(postings[0]).intersection(*postings[1:])
+
+    @staticmethod
+    def _reindex(order, values, pos, old, new):
+        """Переносит позицию pos в отсортированном индексе (order, values) со значения old на new (None — нет в индексе)."""
+        if old is not None:
+            i = bisect_left(values, old)
+            while order[i] != pos:
+                i += 1
+            del order[i], values[i]
+        if new is not None:
+            lo, hi = bisect_left(values, new), bisect_right(values, new)
+            # Среди равных значений позиции идут по возрастанию, как после sorted()
+            i = lo + bisect_left(order[lo:hi], pos)
+            order.insert(i, pos)
+            values.insert(i, new)
+
+    @staticmethod
+    def _sorted_slice(values, bounds, start=0, end=None):
+        """Границы [lo, hi) в отсортированном отрезке values[start:end] для замкнутого диапазона bounds."""
+        end = len(values) if end is None else end
+        low, high = bounds
+        lo = start if low is None else bisect_left(values, low, start, end)
+        hi = end if high is None else bisect_right(values, high, start, end)
+        return lo, max(lo, hi)
+
     @classmethod
     def from_file(cls, path=settings.OUTPUT_FILE):
         """Загружает данные из локального JSON файла."""
@@ -40,67 +181,141 @@ class LevelSearch:
             return cls([])
 
     @classmethod
-    def from_url(cls, url, local_file_path):
+    def from_snapshot(cls, path, source=None):
         """
-        Загружает данные по URL из GitHub Raw и сохраняет их в локальный файл,
-        перезаписывая его, если он существует.
+        Открывает бинарный снимок (см. snapshot.py) без разбора JSON: колонки и индексы
+        отображаются в память, объекты уровней создаются лениво. SnapshotError — снимок
+        отсутствует, поврежден или устарел относительно source.
         """
         try:
-            # Шаг 1: Загрузка данных по URL
-            response = requests.get(url)
-            response.raise_for_status()  # Проверка на ошибки HTTP (404, 500..)
-            data = response.json()
-            print(f"✅ Успешно загружено {len(data)} записей по URL.")
-
-            # Шаг 2: Сохранение данных в локальный файл с перезаписью
-            # Открываем файл в режиме 'w' (write), что автоматически
-            # создаст файл, если его нет, или перезапишет, если он существует.
-            with open(local_file_path, 'w', encoding='utf-8') as f:
-                # Используем json.dump для красивой записи JSON в файл
-                # ensure_ascii=False для корректного отображения не-ASCII символов
-                # indent=4 для форматирования с отступами
-                json.dump(data, f, ensure_ascii=False, indent=4)
-            
-            print(f"✅ Данные успешно сохранены в файл: {os.path.abspath(local_file_path)}")
+            snapshot = Snapshot(path, source)
+        except (OSError, KeyError, ValueError) as e:
+            raise SnapshotError(f"не удалось открыть снимок {path}: {e}") from e
+        searcher = cls.__new__(cls)
+        searcher.__dict__.update(snapshot.search_state())
+        return searcher
 
-            return cls(data)
+    @classmethod
+    def load(cls, path=settings.OUTPUT_FILE):
+        """
+        Быстрая загрузка: снимок рядом с JSON, если он свежий; иначе JSON,
+        после чего снимок пересобирается для следующего старта.
+        """
+        snapshot_path = snapshot_path_for(path)
+        try:
+            searcher = cls.from_snapshot(snapshot_path, source=path)
+            print(f"✅ Загружено {len(searcher.data)} уровней из снимка {snapshot_path}")
+            return searcher
+        except SnapshotError as e:
+            print(f"ℹ️ Снимок не используется: {e}")
+
+        searcher = cls.from_file(path)
+        if searcher.data:
+            try:
+                write_snapshot(searcher, snapshot_path, source=path)
+            except OSError as e:
+                print(f"⚠️ Не удалось записать снимок: {e}")
+        return searcher
+
+    @classmethod
+    def from_url(cls, url, local_file_path):
+        """
+        Синхронизирует локальный файл с данными по URL из GitHub Raw (см. sync.py):
+        файл перезаписывается, только если данные изменились.
+        """
+        try:
+            result = sync_dataset(url, local_file_path)
         except requests.RequestException as e:
             print(f"❌ Не удалось загрузить данные по URL: {e}")
             return cls([])
         except IOError as e:
             print(f"❌ Ошибка при записи в файл: {e}")
             return cls([])
-        except json.JSONDecodeError as e:
-            print(f"❌ Ошибка декодирования JSON: {e}")
+        except ValueError as e:
+            print(f"❌ Некорректные данные по URL: {e}")
             return cls([])
 
+        if result.updated:
+            print(f"✅ Данные обновлены: {local_file_path}" + (f" ({result.diff.summary()})" if result.diff else ""))
+        else:
+            print(f"✅ Данные по URL не изменились, используем {local_file_path}")
+        return cls.load(local_file_path)
+
+    def apply_diff(self, diff, data) -> "LevelSearch":
+        """
+        Возвращает LevelSearch для data — новой версии данных, отличающейся от текущей на diff
+        (см. sync.diff_datasets). Текущий объект не меняется: его могут читать другие запросы.
+        Если поменялись только детали уровней, позиции не сдвигаются: колонки копируются
+        и правятся точечно, а индексы рангов и названий переиспользуются. Иначе — полная сборка.
+        """
+        if diff.is_empty:
+            return self
+        if diff.is_structural:
+            return type(self)(data)
+
+        new = copy.copy(self)
+        new.data = list(self.data)
+        new._duration_col = list(self._duration_col)
+        new._objects_col = list(self._objects_col)
+        new._version_col = list(self._version_col)
+        new._version_index = None
+        new._duration_order, new._durations = list(self._duration_order), list(self._durations)
+        new._objects_order, new._objects = list(self._objects_order), list(self._objects)
+
+        for old, level, _ in diff.changed:
+            pos = self._rank_position(old["rank"], old["list"])
+            level = self._process_data([level])[0]
+            new.data[pos] = level
+            duration = level["duration_seconds"]
+            self._reindex(new._duration_order, new._durations, pos, new._duration_col[pos], duration)
+            new._duration_col[pos] = duration
+            objects = level["objects"] if level.get("objects") is not None else -1
+            old_objects = new._objects_col[pos]
+            self._reindex(new._objects_order, new._objects, pos,
+                          old_objects if old_objects >= 0 else None, objects if objects >= 0 else None)
+            new._objects_col[pos] = objects
+            new._version_col[pos] = level.get("version")
+        return new
+
     def _parse_user_duration(self, query: str) -> int:
         """Парсит запрос пользователя (например, '2m30s') в секунды."""
-        total_seconds = 0
-        # Ищем минуты (e.g., 2m, 5min)
-        minutes_match = re.search(r'(\d+)\s*m', query, re.IGNORECASE)
-        if minutes_match:
-            total_seconds += int(minutes_match.group(1)) * 60
-        
-        # Ищем секунды (e.g., 90s, 30sec)
-        seconds_match = re.search(r'(\d+)\s*s', query, re.IGNORECASE)
-        if seconds_match:
-            total_seconds += int(seconds_match.group(1))
-
-        # Если нет 'm' или 's', считаем что это просто секунды
-        if not minutes_match and not seconds_match and query.isdigit():
-            total_seconds = int(query)
-            
-        return total_seconds
+        return parse_duration(query)
 
     def search_by_name_or_rank(self, query):
-        """Поиск по названию или рангу."""
+        """Поиск по названию или рангу (во всех списках). Результаты упорядочены по спискам и рангу."""
         if query.isdigit():
-            rank = int(query)
-            return [lvl for lvl in self.data if lvl["rank"] == rank]
-        
+            positions = (self._rank_position(int(query), name) for name in self._list_bounds)
+            return [self.data[pos] for pos in positions if pos is not None]
+
         query_low = query.lower()
-        return [lvl for lvl in self.data if query_low in lvl["name"].lower()]
+        candidates = self._name_candidates(query_low)
+        if candidates is None:
+            # Запрос короче триграммы — просто проходим по готовым lower-названиям
+            return [self.data[i] for i, name in enumerate(self._names_low) if query_low in name]
+        return self._levels_at(i for i in candidates if query_low in self._names_low[i])
+
+    def search_fuzzy(self, query, limit=settings.FUZZY_LIMIT, list_name=None):
+        """
+        Нечеткий поиск по названию (опечатки, пропущенные буквы), list_name — только в одном списке.
+        Сходство — коэффициент Дайса по триграммам; результаты упорядочены
+        по убыванию сходства, затем по списку и рангу.
+        """
+        grams = self._padded_trigrams(query.strip().lower())
+        lo, hi = (0, len(self.data)) if list_name is None else self._list_bounds.get(list_name, (0, 0))
+        shared = {}
+        for gram in grams:
+            for pos in self._trigram_index.get(gram, ()):
+                shared[pos] = shared.get(pos, 0) + 1
+
+        scored = []
+        for pos, count in shared.items():
+            if not lo <= pos < hi:
+                continue
+            score = 2 * count / (len(grams) + self._gram_counts[pos])
+            if score >= settings.FUZZY_MIN_SIMILARITY:
+                scored.append((-score, pos))
+        scored.sort()
+        return [self.data[pos] for _, pos in scored[:limit]]
 
     def search_by_duration(self, query):
         """Поиск уровней, которые длиннее или равны указанной длительности."""
@@ -109,7 +324,127 @@ class LevelSearch:
             return []
         
         print(f"Ищем уровни длиннее {required_seconds} секунд...")
-        return [lvl for lvl in self.data if lvl['duration_seconds'] >= required_seconds]
+        start = bisect_left(self._durations, required_seconds)
+        return self._levels_at(self._duration_order[start:])
+
+    def _plan(self, q: LevelQuery) -> list:
+        """
+        Для каждого условия запроса возвращает (оценка числа строк, выборка позиций, проверка позиции).
+        Оценки дешевые: bisect по отсортированным индексам, длины списков.
+        """
+        steps = []
+        if q.list is not None:
+            l_lo, l_hi = self._list_bounds.get(q.list, (0, 0))
+            steps.append((l_hi - l_lo, lambda: range(l_lo, l_hi), lambda i: l_lo <= i < l_hi))
+        if q.rank is not None:
+            # Ранги отсортированы внутри каждого списка: по отрезку позиций на список
+            spans = [self._sorted_slice(self._ranks, q.rank, lo, hi) for lo, hi in self._list_spans(q.list)]
+            spans = [(lo, hi) for lo, hi in spans if lo < hi]
+            select = (lambda: range(*spans[0])) if len(spans) == 1 else \
+                (lambda: list(chain.from_iterable(range(lo, hi) for lo, hi in spans)))
+            steps.append((sum(hi - lo for lo, hi in spans), select,
+                          lambda i: any(lo <= i < hi for lo, hi in spans)))
+        if q.duration is not None:
+            # Длительность 0 — неизвестна, такие уровни в фильтр по длине не попадают
+            bounds = (max(q.duration[0] or 1, 1), q.duration[1])
+            d_lo, d_hi = self._sorted_slice(self._durations, bounds)
+            d_low, d_high = bounds
+            steps.append((d_hi - d_lo, lambda: self._duration_order[d_lo:d_hi],
+                          lambda i: d_low <= self._duration_col[i] and
+                          (d_high is None or self._duration_col[i] <= d_high)))
+        if q.objects is not None:
+            o_lo, o_hi = self._sorted_slice(self._objects, q.objects)
+            o_low, o_high = q.objects
+            steps.append((o_hi - o_lo, lambda: self._objects_order[o_lo:o_hi],
+                          lambda i: self._objects_col[i] >= max(o_low or 0, 0) and
+                          (o_high is None or self._objects_col[i] <= o_high)))
+        if q.version is not None:
+            version_positions = self._version_positions(q.version)
+            steps.append((len(version_positions), lambda: version_positions,
+                          lambda i: self._version_col[i] == q.version))
+        if q.name is not None:
+            name = q.name
+            candidates = self._name_candidates(name)
+            if candidates is None:
+                steps.append((len(self.data), lambda: (i for i, n in enumerate(self._names_low) if name in n),
+                              lambda i: name in self._names_low[i]))
+            else:
+                # Триграммы дают надмножество — подстроку проверяем сразу при выборке
+                steps.append((len(candidates), lambda: (i for i in candidates if name in self._names_low[i]),
+                              lambda i: name in self._names_low[i]))
+        return steps
+
+    def query(self, query) -> list:
+        """
+        Поиск по составному запросу (строка мини-языка или LevelQuery), результаты по спискам и рангу.
+        Сначала выбираются позиции по самому селективному индексу, остальные условия
+        сужают этот набор: пересечением, если их выборка не больше текущего набора,
+        иначе проверкой каждой позиции.
+        """
+        if isinstance(query, str):
+            query = LevelQuery.parse(query)
+        steps = sorted(self._plan(query), key=lambda step: step[0])
+        if not steps:
+            return []
+
+        estimate, select, _ = steps[0]
+        candidates = set(select())
+        for estimate, select, check in steps[1:]:
+            if not candidates:
+                break
+            if estimate <= len(candidates):
+                candidates.intersection_update(select())
+            else:
+                candidates = {i for i in candidates if check(i)}
+        return self._levels_at(candidates)
+
+    def _iter_positions(self, q: LevelQuery, start: int, backward: bool = False):
+        """
+        Лениво перечисляет позиции, подходящие под запрос, в порядке выдачи (список, ранг):
+        от start вперед или от start - 1 назад. Выборка по рангам и узкие выборки
+        (не больше 1/CURSOR_SCAN_RATIO данных) перебираются по своему индексу,
+        широкие — проходом по позициям с проверкой условий, пока не наберется страница.
+        """
+        steps = sorted(self._plan(q), key=lambda step: step[0])
+        if not steps:
+            return
+        estimate, select, _ = steps[0]
+        checks = [check for _, _, check in steps[1:]]
+        if estimate * settings.CURSOR_SCAN_RATIO > len(self.data):
+            positions = range(len(self.data))
+            checks = [check for _, _, check in steps]
+        else:
+            positions = select()
+            if not isinstance(positions, range):
+                positions = sorted(positions)
+
+        i = bisect_left(positions, start)
+        indexes = range(i - 1, -1, -1) if backward else range(i, len(positions))
+        for i in indexes:
+            pos = positions[i]
+            if all(check(pos) for check in checks):
+                yield pos
+
+    def page(self, query, cursor=None, limit=settings.PAGE_SIZE, backward=False) -> tuple:
+        """
+        Страница результатов по курсору (список, ранг): limit уровней не раньше курсора
+        (или, при backward, последние limit уровней до курсора) в порядке (список, ранг).
+        Возвращает (уровни, есть ли еще результаты в том же направлении).
+        Вычисляются только строки страницы, весь список совпадений не строится.
+        """
+        if isinstance(query, str):
+            query = LevelQuery.parse(query)
+        start = 0 if cursor is None else self._cursor_position(cursor)
+        if cursor is None and backward:
+            start = len(self.data)
+        positions = []
+        more = False
+        for pos in self._iter_positions(query, start, backward):
+            if len(positions) == limit:
+                more = True
+                break
+            positions.append(pos)
+        return self._levels_at(positions), more
 
     def interactive(self):
         """Запускает интерактивный режим поиска."""
@@ -123,6 +458,8 @@ class LevelSearch:
                 " - Ранг (например, '1')\n"
                 " - Часть названия (например, 'slaughterhouse')\n"
                 " - Длительность (например, 'len > 2m30s' или 'len > 150s')\n"
+                " - Фильтры вместе (например, 'len >= 2m rank 1-100 objects < 200000 version 2.2 name:wave')\n"
+                " - Один список (например, 'list:platformer 1-10'), без него ищем во всех\n"
                 "   (Нажмите Enter для выхода)\n> "
             )
             q = input(prompt).strip()
@@ -130,22 +467,25 @@ class LevelSearch:
             if not q:
                 break
 
-            results = []
-            if q.lower().startswith('len >'):
-                duration_query = q[5:].strip()
-                results = self.search_by_duration(duration_query)
-            else:
-                results = self.search_by_name_or_rank(q)
-            
+            try:
+                parsed = LevelQuery.parse(q)
+            except QueryError as e:
+                print(f"❌ {e}")
+                continue
+
+            results = self.query(parsed)
+            if not results and parsed.is_name_only:
+                results = self.search_fuzzy(parsed.name, list_name=parsed.list)
+                if results:
+                    print("🤔 Точных совпадений нет, возможно, вы имели в виду:")
+
             if not results:
                 print("❌ Ничего не найдено.")
                 continue
 
-            # Сортируем результаты по рангу для наглядности
-            results.sort(key=lambda x: x["rank"])
-
             print(f"\n✨ Найдено результатов: {len(results)}")
             for r in results:
                 duration = r['duration_seconds']
                 length_str = f"{duration // 60}:{duration % 60:02d}"
-                print(f"  #{r['rank']:<4} - {r['name']} (Длительность: {length_str})\n     {r['link']}")
\ No newline at end of file
+                print(f"  {list_title(r['list']):<10} #{r['rank']:<4} - {r['name']} (Длительность: {length_str})\n"
+                      f"     {r['link']}")
\ No newline at end of file
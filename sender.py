@@ -0,0 +1,496 @@
+# sender.py
+"""
+Исходящие запросы к Telegram Bot API: ограниченная очередь с FIFO на каждый чат,
+планировщик на token bucket (общий лимит бота и лимит на каждый чат), повторы с учетом
+429 retry_after, пакетная отправка уведомлений админу и метрики.
+
+Лимиты Telegram — около 30 сообщений в секунду на бота и около одного
+в секунду в один чат (короткие всплески допустимы). При превышении
+API отвечает 429 с parameters.retry_after.
+"""
+import asyncio
+import heapq
+import threading
+import time
+from collections import deque
+
+import aiohttp
+import requests
+
+import metrics
+import settings
+from settings import ADMIN_ID
+
+MESSAGE_LIMIT = 4096  # максимальная длина текста сообщения
+MAX_CHAT_BUCKETS = 10000
+
+API_SECONDS = metrics.histogram("telegram_api_seconds", "Время одного запроса к Bot API", ("method",))
+SEND_SECONDS = metrics.histogram("telegram_send_seconds", "От постановки в очередь до доставки", ("method",))
+SENDS = metrics.counter("telegram_sends_total", "Исходы отправки: sent, retried, failed, dropped", ("method", "result"))
+QUEUE_DEPTH = metrics.gauge("telegram_send_queue_depth", "Запросов в очереди отправки", ("sender",))
+
+
+class TokenBucket:
+    """rate токенов в секунду, не больше capacity в запасе. rate=None — без ограничения."""
+
+    def __init__(self, rate, capacity, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0  # после 429: до этого момента отправлять нельзя
+
+    def wait_time(self, now: float) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.rate is None:
+            return 0.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        if self.rate is not None:
+            self.tokens -= 1
+
+    def is_idle(self, now: float) -> bool:
+        return now >= self.blocked_until and (self.rate is None or self.tokens >= self.capacity)
+
+
+class RateLimiter:
+    """Общий bucket бота и по bucket на чат. Потокобезопасен, общий для всех отправителей процесса."""
+
+    def __init__(self, global_rate=settings.SEND_GLOBAL_RATE, global_burst=settings.SEND_GLOBAL_BURST,
+                 chat_rate=settings.SEND_CHAT_RATE, chat_burst=settings.SEND_CHAT_BURST, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._global = TokenBucket(global_rate, global_burst, clock())
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._chats = {}
+
+    @classmethod
+    def unlimited(cls) -> "RateLimiter":
+        return cls(None, 0, None, 0)
+
+    def _chat(self, chat_id, now):
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                # Полные buckets ничего не помнят — их можно выбросить
+                for key in [k for k, b in self._chats.items() if b.wait_time(now) == 0 and b.is_idle(now)]:
+                    del self._chats[key]
+            bucket = self._chats[chat_id] = TokenBucket(self._chat_rate, self._chat_burst, now)
+        return bucket
+
+    def reserve(self, chat_id=None) -> float:
+        """0 — можно отправлять (токены списаны), иначе сколько секунд подождать до новой попытки."""
+        with self._lock:
+            now = self._clock()
+            buckets = [self._global] if chat_id is None else [self._global, self._chat(chat_id, now)]
+            wait = max(bucket.wait_time(now) for bucket in buckets)
+            if wait > 0:
+                return wait
+            for bucket in buckets:
+                bucket.take()
+            return 0.0
+
+    def block(self, chat_id, seconds: float):
+        """429: не отправлять в чат (или вообще, если чат неизвестен) ближайшие seconds секунд."""
+        with self._lock:
+            now = self._clock()
+            bucket = self._global if chat_id is None else self._chat(chat_id, now)
+            bucket.blocked_until = max(bucket.blocked_until, now + seconds)
+
+
+class SendMetrics:
+    """Счетчики отправки, глубина очереди и задержки (от постановки в очередь до доставки и самого запроса)."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self._latencies = deque(maxlen=window)
+        self._api_latencies = deque(maxlen=window)
+
+    def observe_depth(self, depth: int):
+        with self._lock:
+            self.queue_depth = depth
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def observe(self, name: str, value: float = None, method: str = "unknown"):
+        """name — 'sent' (value — полная задержка), 'api' (value — время запроса), 'failed', 'retried', 'dropped'."""
+        if name == "api":
+            API_SECONDS.observe(value, method=method)
+        else:
+            SENDS.inc(method=method, result=name)
+            if name == "sent":
+                SEND_SECONDS.observe(value, method=method)
+        with self._lock:
+            if name == "sent":
+                self.sent += 1
+                self._latencies.append(value)
+            elif name == "api":
+                self._api_latencies.append(value)
+            else:
+                setattr(self, name, getattr(self, name) + 1)
+
+    @staticmethod
+    def _percentiles(values) -> dict:
+        if not values:
+            return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+        ordered = sorted(values)
+        return {
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            "max": ordered[-1],
+        }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "failed": self.failed,
+                "retried": self.retried,
+                "dropped": self.dropped,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "latency_s": self._percentiles(self._latencies),
+                "api_latency_s": self._percentiles(self._api_latencies),
+            }
+
+
+def retry_delay(status, payload: dict, attempt: int):
+    """Через сколько секунд повторить запрос; None — повторять не нужно (успех или ошибка запроса)."""
+    if status == 429:
+        return float((payload.get("parameters") or {}).get("retry_after", 1))
+    if status is None or status >= 500:
+        return settings.SEND_BACKOFF * 2 ** attempt
+    return None
+
+
+def _method(url: str) -> str:
+    return url.rsplit("/", 1)[-1]
+
+
+class SendSchedule:
+    """
+    Очередь отправки с планированием по чатам: у каждого чата своя FIFO, а в куче лежат
+    чаты с моментом, когда им можно отправлять. Воркер получает запрос только из чата,
+    у которого есть токен: чат с длинной очередью не занимает всех воркеров ожиданием
+    своего лимита, а его сообщения уходят по порядку (в чат одновременно идет не больше
+    одного запроса). Запросы без чата (chat_id=None) друг друга не ждут.
+    Не потокобезопасна: синхронизацию обеспечивает отправитель.
+    """
+
+    def __init__(self, limiter: RateLimiter, clock=time.monotonic):
+        self.limiter = limiter
+        self._clock = clock
+        self._chats = {}    # chat_id -> deque запросов
+        self._heap = []     # (когда можно отправлять, порядковый номер, chat_id)
+        self._busy = set()  # чаты, запрос в которые сейчас выполняется
+        self._seq = 0
+        self.size = 0       # запросов в очереди и в работе
+
+    def _schedule(self, chat_id, at: float):
+        self._seq += 1
+        heapq.heappush(self._heap, (at, self._seq, chat_id))
+
+    def push(self, item, chat_id):
+        chat = self._chats.setdefault(chat_id, deque())
+        chat.append(item)
+        self.size += 1
+        # Чат в куче, пока у него есть запросы и ни один не выполняется
+        if len(chat) == 1 and chat_id not in self._busy:
+            self._schedule(chat_id, self._clock())
+
+    def pop(self) -> tuple:
+        """
+        (запрос, 0) — можно отправлять, токены уже списаны; (None, секунды) — раньше
+        ни один чат не освободится; (None, None) — отправлять нечего.
+        """
+        while self._heap:
+            at, _, chat_id = self._heap[0]
+            now = self._clock()
+            if at > now:
+                return None, at - now
+            heapq.heappop(self._heap)
+            wait = self.limiter.reserve(chat_id)
+            if wait > 0:
+                self._schedule(chat_id, now + wait)
+                continue
+            chat = self._chats[chat_id]
+            item = chat.popleft()
+            if chat_id is None:
+                if chat:
+                    self._schedule(None, now)
+            else:
+                self._busy.add(chat_id)
+            return item, 0.0
+        return None, None
+
+    def finish(self, chat_id, retry=None, delay: float = 0.0):
+        """Запрос в чат выполнен; retry — вернуть запрос в начало очереди чата для повтора через delay секунд."""
+        chat = self._chats.setdefault(chat_id, deque())
+        if retry is not None:
+            chat.appendleft(retry)
+        else:
+            self.size -= 1
+        if chat_id is not None:
+            self._busy.discard(chat_id)
+            if chat:
+                self._schedule(chat_id, self._clock() + delay)
+            else:
+                del self._chats[chat_id]
+        elif retry is not None and len(chat) == 1:
+            self._schedule(None, self._clock() + delay)
+
+
+def _outcome(sender, url, chat_id, enqueued, attempt, status, payload):
+    """Итог одной попытки: пауза до повтора или None, если запрос доставлен или повторять не нужно."""
+    if status == 200:
+        sender.metrics.observe("sent", time.monotonic() - enqueued, _method(url))
+        return None
+    delay = retry_delay(status, payload, attempt)
+    if delay is None or attempt == settings.SEND_MAX_RETRIES:
+        sender.metrics.observe("failed", method=_method(url))
+        print(f"❌ Telegram {_method(url)} не удался: {status} {payload.get('description', '')}")
+        return None
+    sender.metrics.observe("retried", method=_method(url))
+    if status == 429:
+        # Повтор подождет в расписании вместе с остальными запросами в этот чат
+        sender.limiter.block(chat_id, delay)
+    return delay
+
+
+class TelegramSender:
+    """
+    Отправка в фоновых потоках: send() кладет запрос в ограниченную очередь с планированием
+    по чатам (SendSchedule), воркеры берут готовые к отправке запросы и возвращают
+    в расписание те, что нужно повторить при 429 и ошибках сервера.
+    """
+
+    def __init__(self, limiter: RateLimiter = None, workers: int = settings.SEND_WORKERS,
+                 queue_size: int = settings.SEND_QUEUE_SIZE):
+        self.limiter = limiter or RateLimiter()
+        self.metrics = SendMetrics()
+        self.workers = workers
+        self.queue_size = queue_size
+        self._schedule = SendSchedule(self.limiter)
+        self._cond = threading.Condition()
+        self._closing = False
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._session = requests.Session()
+        QUEUE_DEPTH.set_function(lambda: self._schedule.size, sender="threads")
+
+    def _start(self):
+        with self._start_lock:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._worker, name=f"tg-sender-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def send(self, url: str, data: dict, chat_id=None) -> bool:
+        """Ставит запрос в очередь. False — очередь так и не освободилась, запрос отброшен."""
+        self._start()
+        deadline = time.monotonic() + settings.SEND_ENQUEUE_TIMEOUT
+        with self._cond:
+            while self._schedule.size >= self.queue_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.metrics.observe("dropped", method=_method(url))
+                    print(f"⚠️ Очередь отправки переполнена, {_method(url)} отброшен")
+                    return False
+                self._cond.wait(remaining)
+            self._schedule.push((url, data, chat_id, time.monotonic(), 0), chat_id)
+            self._cond.notify_all()
+            self.metrics.observe_depth(self._schedule.size)
+        return True
+
+    def _post(self, url, data):
+        try:
+            response = self._session.post(url, data=data, timeout=settings.BOT_HTTP_TIMEOUT)
+        except requests.RequestException as e:
+            return None, {"description": str(e)}
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, {}
+
+    def _attempt(self, url, data, chat_id, enqueued, attempt):
+        started = time.monotonic()
+        status, payload = self._post(url, data)
+        self.metrics.observe("api", time.monotonic() - started, _method(url))
+        return _outcome(self, url, chat_id, enqueued, attempt, status, payload)
+
+    def _next(self):
+        """Следующий запрос, который можно отправить прямо сейчас; None — отправитель закрыт."""
+        with self._cond:
+            while True:
+                item, wait = self._schedule.pop()
+                if item is not None:
+                    return item
+                if self._closing and self._schedule.size == 0:
+                    return None
+                self._cond.wait(wait)
+
+    def _worker(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            url, data, chat_id, enqueued, attempt = item
+            delay = None
+            try:
+                delay = self._attempt(url, data, chat_id, enqueued, attempt)
+            except Exception as e:
+                print(f"❌ Ошибка отправки: {e}")
+            with self._cond:
+                retry = None if delay is None else (url, data, chat_id, enqueued, attempt + 1)
+                self._schedule.finish(chat_id, retry, delay or 0.0)
+                self._cond.notify_all()
+                self.metrics.observe_depth(self._schedule.size)
+
+    def close(self):
+        """Дожидается отправки всего, что уже в очереди, и останавливает воркеров."""
+        if not self._threads:
+            return
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._closing = False
+
+
+class AsyncTelegramSender:
+    """То же для asyncio: воркеры — задачи в цикле событий, запросы идут через общую aiohttp-сессию."""
+
+    def __init__(self, session: aiohttp.ClientSession, limiter: RateLimiter = None,
+                 workers: int = settings.BOT_WORKERS, queue_size: int = settings.SEND_QUEUE_SIZE):
+        self.session = session
+        self.limiter = limiter or RateLimiter()
+        self.metrics = SendMetrics()
+        self.queue_size = queue_size
+        self._schedule = SendSchedule(self.limiter)
+        self._cond = asyncio.Condition()
+        self._closing = False
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(workers)]
+        QUEUE_DEPTH.set_function(lambda: self._schedule.size, sender="asyncio")
+
+    async def send(self, url: str, data: dict, chat_id=None):
+        """Ставит запрос в очередь; если она заполнена — ждет, притормаживая обработчики."""
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._schedule.size < self.queue_size)
+            self._schedule.push((url, data, chat_id, time.monotonic(), 0), chat_id)
+            self._cond.notify_all()
+            self.metrics.observe_depth(self._schedule.size)
+
+    async def _post(self, url, data):
+        try:
+            async with self.session.post(url, data=data) as response:
+                try:
+                    return response.status, await response.json(content_type=None)
+                except ValueError:
+                    return response.status, {}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return None, {"description": str(e) or type(e).__name__}
+
+    async def _attempt(self, url, data, chat_id, enqueued, attempt):
+        started = time.monotonic()
+        status, payload = await self._post(url, data)
+        self.metrics.observe("api", time.monotonic() - started, _method(url))
+        return _outcome(self, url, chat_id, enqueued, attempt, status, payload)
+
+    async def _next(self):
+        async with self._cond:
+            while True:
+                item, wait = self._schedule.pop()
+                if item is not None:
+                    return item
+                if self._closing and self._schedule.size == 0:
+                    return None
+                try:
+                    await asyncio.wait_for(self._cond.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _worker(self):
+        while True:
+            item = await self._next()
+            if item is None:
+                return
+            url, data, chat_id, enqueued, attempt = item
+            delay = None
+            try:
+                delay = await self._attempt(url, data, chat_id, enqueued, attempt)
+            except Exception as e:
+                print(f"❌ Ошибка отправки: {e}")
+            async with self._cond:
+                retry = None if delay is None else (url, data, chat_id, enqueued, attempt + 1)
+                self._schedule.finish(chat_id, retry, delay or 0.0)
+                self._cond.notify_all()
+                self.metrics.observe_depth(self._schedule.size)
+
+    async def close(self):
+        """Дожидается отправки всего, что уже в очереди, и останавливает воркеров."""
+        async with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def _batch_texts(texts: list, limit: int = MESSAGE_LIMIT) -> list:
+    """Склеивает уведомления в как можно меньшее число сообщений не длиннее limit."""
+    batches, current = [], ""
+    for text in texts:
+        text = text[:limit]
+        if current and len(current) + 2 + len(text) > limit:
+            batches.append(current)
+            current = ""
+        current = f"{current}\n\n{text}" if current else text
+    if current:
+        batches.append(current)
+    return batches
+
+
+class AdminNotifier:
+    """
+    Уведомления админу: все, что пришло в пределах window секунд, уходит одним
+    сообщением (или несколькими, если не влезает в лимит длины).
+    """
+
+    def __init__(self, sender: TelegramSender, api_url: str, chat_id=ADMIN_ID,
+                 window: float = settings.ADMIN_BATCH_WINDOW):
+        self.sender = sender
+        self.api_url = api_url
+        self.chat_id = chat_id
+        self.window = window
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def notify(self, text: str):
+        with self._lock:
+            self._pending.append(text)
+            if self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            texts, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        for text in _batch_texts(texts):
+            data = {"chat_id": self.chat_id, "text": text, "parse_mode": "HTML"}
+            self.sender.send(f"{self.api_url}/sendMessage", data, self.chat_id)
@@ -7,12 +7,70 @@ dotenv.load_dotenv()
 # Настройки Telegram
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 ADMIN_ID = 6297290680
+
+# --- Режим работы бота ---
+# "async" — aiohttp + пул воркеров, "webhook" — то же, но апдейты приходят
+# на встроенный HTTP-сервер, "sync" — старый блокирующий цикл
+BOT_MODE = os.getenv("BOT_MODE", "async")
+BOT_WORKERS = 16
+BOT_QUEUE_SIZE = 1000
+BOT_HTTP_POOL_SIZE = 32
+BOT_HTTP_TIMEOUT = 10
+BOT_POLL_TIMEOUT = 100
+
+# --- Вебхук ---
+# Публичный HTTPS-адрес, который регистрируется через setWebhook (пусто — не регистрировать)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+# Секрет, которым Telegram подписывает запросы к вебхуку; без него вебхук стартует только на 127.0.0.1
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_PATH = "/webhook"
+WEBHOOK_DEDUP_SIZE = 10000
+
+# --- Исходящие сообщения (sender.py) ---
+# Лимиты Telegram: ~30 сообщений/с на бота и ~1/с в один чат, короткие всплески допустимы
+SEND_GLOBAL_RATE = 30
+SEND_GLOBAL_BURST = 30
+SEND_CHAT_RATE = 1
+SEND_CHAT_BURST = 3
+SEND_QUEUE_SIZE = 1000
+SEND_WORKERS = 4
+# Сколько ждать места в заполненной очереди, прежде чем отбросить сообщение (секунды)
+SEND_ENQUEUE_TIMEOUT = 5
+# Повторы при 429 (ждем retry_after) и ошибках сервера/сети (SEND_BACKOFF * 2^попытка)
+SEND_MAX_RETRIES = 5
+SEND_BACKOFF = 0.5
+# Уведомления админу, пришедшие в пределах окна (секунды), уходят одним сообщением
+ADMIN_BATCH_WINDOW = 10
+
+# --- Метрики и профилирование (metrics.py) ---
+# Локальный HTTP с /metrics (Prometheus) и /debug/*; 0 — выключить
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+SCRAPER_METRICS_PORT = int(os.getenv("SCRAPER_METRICS_PORT", "9109"))
+# Итоговые метрики скрапера для textfile-коллектора node_exporter
+SCRAPER_METRICS_FILE = "data/scraper.prom"
+PROFILE_DIR = "data/profiles"
+TRACEMALLOC_FRAMES = 10
+
+# Как часто фоновый поток проверяет, не обновился ли JSON с данными (секунды)
+RELOAD_CHECK_INTERVAL = 5
  
 # --- Основные настройки ---
 BASE_URL = "https://demonlist.org"
 # Данные теперь будут храниться в папке data/
 OUTPUT_FILE = "data/demonlist.json"
 
+# --- Списки Demonlist (lists.py) ---
+# Какие списки собирает скрапер; все хранятся в OUTPUT_FILE, у уровня есть поле "list".
+# platformer и challenge зарегистрированы в lists.py, но их разметка еще не сверена с сайтом
+SCRAPE_LISTS = ("classic",)
+# Список для записей без поля "list" (данные, собранные до мультисписков)
+DEFAULT_LIST = "classic"
+# Сколько списков собирать одновременно (у каждого свои DETAIL_CONCURRENCY вкладок)
+LIST_CONCURRENCY = 3
+
 # --- Настройки Playwright ---
 HEADLESS = False
 SLOW_MO = 50
@@ -20,17 +78,70 @@ SLOW_MO = 50
 # --- Тайм-ауты (в миллисекундах) ---
 PAGE_LOAD_TIMEOUT = 60000
 SELECTOR_TIMEOUT = 30000
+DETAIL_SELECTOR_TIMEOUT = 15000
+
+# --- Сбор деталей уровней ---
+# Количество параллельных вкладок (1 — последовательный режим)
+DETAIL_CONCURRENCY = 8
+# Пауза после загрузки страницы уровня (секунды), на случай анимаций
+DETAIL_SETTLE_DELAY = 0.5
+# Перескачивать детали только у новых/сдвинувшихся/устаревших уровней
+INCREMENTAL_SCRAPE = True
+# Через сколько дней детали уровня считаются устаревшими
+DETAILS_MAX_AGE_DAYS = 7
+# Журнал прогресса: после падения следующий запуск продолжает с того же места
+CHECKPOINT_FILE = "data/demonlist.checkpoint.jsonl"
+# Повторы упавших уровней после основного прохода, пауза SCRAPE_RETRY_BACKOFF * 2^(попытка-1) с
+SCRAPE_RETRIES = 3
+SCRAPE_RETRY_BACKOFF = 5
+
+# --- HTTP-бэкенд (без браузера) ---
+# "http" — сначала пробуем обычные HTTP-запросы, "playwright" — только браузер
+SCRAPER_BACKEND = "http"
+HTTP_CONCURRENCY = 16
+HTTP_TIMEOUT = 20
+HTTP_RETRIES = 3
+HTTP_BACKOFF = 0.5
+# Если по HTTP уровней в списке меньше этой доли от прошлого прогона, HTML считается
+# неполным и список собирается через Playwright; если и там меньше — список не сохраняется
+# (остается прошлая версия, список попадает в failed_lists)
+HTTP_MIN_LIST_RATIO = 0.9
+HTTP_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
 
 # --- Настройки умного скролла ---
+# Сколько секунд DOM должен "молчать", чтобы пачка карточек считалась загруженной
 SCROLL_PAUSE = 0.5
+# Максимальное ожидание новых карточек после одной прокрутки (секунды)
 MAX_WAIT_FOR_NEW = 5
 MAX_SCROLL_ROUNDS = 200
 MAX_NO_NEW_ATTEMPTS = 5
-FAST_SCROLLS_PER_STEP = 3
+# Размер пачки подгрузки: неполная пачка означает конец списка
 STUCK_CARD_MULTIPLE = 150
 
 
+# --- Нечеткий поиск по названию ---
+# Минимальное сходство по триграммам (0..1), ниже которого вариант не предлагается
+FUZZY_MIN_SIMILARITY = 0.45
+FUZZY_LIMIT = 5
+
+# --- Кэш ответов бота ---
+# Сколько готовых ответов держать и сколько секунд ответ считается свежим
+REPLY_CACHE_SIZE = 2048
+REPLY_CACHE_TTL = 300
+
+# --- Постраничный вывод ---
+PAGE_SIZE = 10
+# Сколько запросов помнить для кнопок листания и как долго (секунды)
+PAGE_QUERIES_SIZE = 10000
+PAGE_QUERIES_TTL = 24 * 3600
+# Если самое узкое условие отбирает больше 1/CURSOR_SCAN_RATIO уровней, страница
+# набирается проходом по рангам, а не сортировкой всех совпадений
+CURSOR_SCAN_RATIO = 8
+
+
 # --- Настройки Github ---
 GITHUB_RAW_URL = "https://raw.githubusercontent.com/justkingyt1/get_top_gd_lvls/main/data/demonlist.json"
 LOCAL_DATA_PATH = "data/demonlist.json"
+# Тайм-аут запроса к GitHub при синхронизации (секунды)
+SYNC_TIMEOUT = 30
 
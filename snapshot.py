@@ -0,0 +1,298 @@
+# snapshot.py
+"""
+Компактный бинарный снимок данных для быстрого старта бота.
+
+Файл (рядом с JSON, расширение .snap) отображается в память через mmap:
+колонки и индексы читаются напрямую из файла как типизированные memoryview,
+без json.load и без словаря на каждый уровень.
+
+Формат:
+    MAGIC (4 байта) | длина заголовка (uint32) | заголовок JSON | секции
+Заголовок описывает секции: {"имя": [смещение, длина, typecode]}; смещения
+считаются от начала области секций (сразу за заголовком, с выравниванием на 8).
+Там же границы списков {"classic": [от, до)} — отрезки позиций, занятые каждым списком.
+Все строки (названия, ссылки, версии...) лежат в одной таблице без повторов,
+колонки хранят номера строк.
+"""
+import array
+import json
+import mmap
+import os
+import struct
+import sys
+from collections.abc import Sequence
+
+from storage import atomic_write_bytes
+
+MAGIC = b"GDLS"
+FORMAT_VERSION = 2
+NO_STRING = 0xFFFFFFFF
+GRAM_WIDTH = 12  # 3 символа UTF-8 по 4 байта максимум
+
+STRING_FIELDS = ("list", "name", "link", "length", "version", "scraped_at")
+
+
+class SnapshotError(Exception):
+    """Снимок отсутствует, устарел или поврежден — нужно грузить JSON."""
+
+
+def snapshot_path_for(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".snap"
+
+
+def _source_signature(json_path: str):
+    st = os.stat(json_path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+# --- Запись ---
+
+def write_snapshot(searcher, path: str, source: str = None):
+    """
+    Сохраняет уже построенный LevelSearch (колонки и индексы) в бинарный снимок.
+    source — JSON, из которого построены данные: по нему снимок проверяется на свежесть.
+    """
+    strings, string_ids = [], {}
+
+    def intern(value):
+        if value is None:
+            return NO_STRING
+        value = str(value)
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value)
+        return string_ids[value]
+
+    data = searcher.data
+    sections = {
+        "rank": array.array("i", searcher._ranks),
+        "duration": array.array("i", searcher._duration_col),
+        "objects": array.array("q", searcher._objects_col),
+        "gram_counts": array.array("H", searcher._gram_counts),
+        "duration_order": array.array("I", searcher._duration_order),
+        "durations": array.array("i", searcher._durations),
+        "objects_order": array.array("I", searcher._objects_order),
+        "objects_sorted": array.array("q", searcher._objects),
+    }
+    for field in STRING_FIELDS:
+        sections[f"{field}_id"] = array.array("I", (intern(lvl.get(field)) for lvl in data))
+    sections["name_low_id"] = array.array("I", (intern(name) for name in searcher._names_low))
+
+    # Триграммы: отсортированные ключи фиксированной ширины + списки позиций подряд
+    grams = sorted(searcher._trigram_index, key=lambda g: g.encode("utf-8"))
+    keys, offsets, postings = bytearray(), array.array("I", [0]), array.array("I")
+    for gram in grams:
+        keys += gram.encode("utf-8").ljust(GRAM_WIDTH, b"\0")
+        postings.extend(sorted(searcher._trigram_index[gram]))
+        offsets.append(len(postings))
+    sections["gram_keys"] = array.array("B", keys)
+    sections["gram_offsets"] = offsets
+    sections["gram_postings"] = postings
+
+    encoded = [s.encode("utf-8") for s in strings]
+    string_offsets = array.array("I", [0])
+    for item in encoded:
+        string_offsets.append(string_offsets[-1] + len(item))
+    sections["string_offsets"] = string_offsets
+    sections["string_blob"] = array.array("B", b"".join(encoded))
+
+    header = {
+        "format": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "count": len(data),
+        "lists": {name: list(span) for name, span in searcher._list_bounds.items()},
+        "source": _source_signature(source) if source else None,
+        "sections": {},
+    }
+    payload = []
+    position = 0
+    for name, values in sections.items():
+        raw = values.tobytes()
+        header["sections"][name] = [position, len(raw), values.typecode]
+        payload.append(raw + b"\0" * (-len(raw) % 8))
+        position += len(raw) + (-len(raw) % 8)
+    header_raw = json.dumps(header).encode("utf-8")
+    header_raw += b" " * (-(8 + len(header_raw)) % 8)
+    atomic_write_bytes(path, MAGIC + struct.pack("<I", len(header_raw)) + header_raw + b"".join(payload))
+
+
+# --- Чтение ---
+
+class StringTable:
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def get(self, string_id):
+        if string_id == NO_STRING:
+            return None
+        return bytes(self._blob[self._offsets[string_id]:self._offsets[string_id + 1]]).decode("utf-8")
+
+
+class StringColumn(Sequence):
+    """Колонка строк по позициям: строка декодируется только при обращении."""
+
+    __slots__ = ("_table", "_ids")
+
+    def __init__(self, table: StringTable, ids):
+        self._table = table
+        self._ids = ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, pos):
+        return self._table.get(self._ids[pos])
+
+
+class TrigramTable:
+    """Триграммный индекс из снимка: поиск ключа бинарным поиском, позиции — срез memoryview."""
+
+    def __init__(self, keys, offsets, postings):
+        self._keys = keys
+        self._offsets = offsets
+        self._postings = postings
+        self._count = len(offsets) - 1
+
+    def __len__(self):
+        return self._count
+
+    def _key(self, i):
+        return bytes(self._keys[i * GRAM_WIDTH:(i + 1) * GRAM_WIDTH])
+
+    def get(self, gram, default=None):
+        key = gram.encode("utf-8").ljust(GRAM_WIDTH, b"\0")
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._key(lo) == key:
+            return self._postings[self._offsets[lo]:self._offsets[lo + 1]]
+        return default
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._key(i).rstrip(b"\0").decode("utf-8")
+
+    def __getitem__(self, gram):
+        postings = self.get(gram)
+        if postings is None:
+            raise KeyError(gram)
+        return postings
+
+
+class Level:
+    """Легкий доступ к уровню из снимка с интерфейсом словаря (level["name"], level.get(...))."""
+
+    __slots__ = ("_snapshot", "_pos")
+
+    FIELDS = ("list", "rank", "name", "link", "length", "objects", "version", "scraped_at", "duration_seconds")
+
+    def __init__(self, snapshot, pos: int):
+        self._snapshot = snapshot
+        self._pos = pos
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return self._snapshot.field(key, self._pos)
+
+    def get(self, key, default=None):
+        if key not in self.FIELDS:
+            return default
+        value = self._snapshot.field(key, self._pos)
+        return default if value is None else value
+
+    def keys(self):
+        return self.FIELDS
+
+    def to_dict(self) -> dict:
+        return {key: self[key] for key in self.FIELDS}
+
+    def __repr__(self):
+        return f"Level({self.to_dict()!r})"
+
+
+class LazyLevels(Sequence):
+    """Список уровней снимка: объекты Level создаются только при обращении."""
+
+    __slots__ = ("_snapshot",)
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    def __len__(self):
+        return self._snapshot.count
+
+    def __getitem__(self, pos):
+        if isinstance(pos, slice):
+            return [Level(self._snapshot, i) for i in range(*pos.indices(len(self)))]
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError(pos)
+        return Level(self._snapshot, pos)
+
+
+class Snapshot:
+    """Открытый снимок: mmap файла и типизированные представления секций."""
+
+    def __init__(self, path: str, source: str = None):
+        with open(path, "rb") as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # пустой файл
+                raise SnapshotError(f"пустой снимок {path}") from e
+        view = memoryview(self._mmap)
+        if bytes(view[:4]) != MAGIC:
+            raise SnapshotError(f"{path} — не снимок Demonlist")
+        (header_len,) = struct.unpack("<I", view[4:8])
+        header = json.loads(bytes(view[8:8 + header_len]))
+        if header["format"] != FORMAT_VERSION or header["byteorder"] != sys.byteorder:
+            raise SnapshotError(f"{path}: несовместимый формат снимка")
+        if source is not None and header["source"] != _source_signature(source):
+            raise SnapshotError(f"{path} устарел относительно {source}")
+
+        self.count = header["count"]
+        self.list_bounds = {name: tuple(span) for name, span in header["lists"].items()}
+        self.sections = {}
+        base = 8 + header_len
+        for name, (offset, length, typecode) in header["sections"].items():
+            self.sections[name] = view[base + offset:base + offset + length].cast(typecode)
+
+        self.strings = StringTable(self.sections["string_offsets"], self.sections["string_blob"])
+        self.columns = {field: StringColumn(self.strings, self.sections[f"{field}_id"]) for field in STRING_FIELDS}
+
+    def field(self, key: str, pos: int):
+        if key == "rank":
+            return self.sections["rank"][pos]
+        if key == "duration_seconds":
+            return self.sections["duration"][pos]
+        if key == "objects":
+            objects = self.sections["objects"][pos]
+            return objects if objects >= 0 else None
+        return self.columns[key][pos]
+
+    def search_state(self) -> dict:
+        """Атрибуты для LevelSearch: те же колонки и индексы, что строит _build_indexes."""
+        sections = self.sections
+        return {
+            "data": LazyLevels(self),
+            "_lists": self.columns["list"],
+            "_list_bounds": self.list_bounds,
+            "_ranks": sections["rank"],
+            "_duration_col": sections["duration"],
+            "_objects_col": sections["objects"],
+            "_version_col": self.columns["version"],
+            "_version_index": None,
+            "_duration_order": sections["duration_order"],
+            "_durations": sections["durations"],
+            "_objects_order": sections["objects_order"],
+            "_objects": sections["objects_sorted"],
+            "_names_low": StringColumn(self.strings, sections["name_low_id"]),
+            "_trigram_index": TrigramTable(sections["gram_keys"], sections["gram_offsets"], sections["gram_postings"]),
+            "_gram_counts": sections["gram_counts"],
+        }
@@ -0,0 +1,199 @@
+# storage.py
+"""
+Работа с файлом данных: атомарная запись и фоновое слежение за обновлениями.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+
+import settings
+
+REQUIRED_FIELDS = ("rank", "name", "link")
+
+
+def _file_mode(path: str) -> int:
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def atomic_write_bytes(path: str, payload: bytes):
+    """
+    Пишет файл через временный файл в той же папке и os.replace:
+    читатели видят либо старое, либо новое содержимое целиком, но не половину.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix=os.path.basename(path), dir=directory)
+    try:
+        # mkstemp создает файл с правами 0600 — сохраняем права заменяемого файла
+        os.chmod(tmp_path, _file_mode(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def atomic_write_text(path: str, text: str):
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_json(path: str, data, indent: int = 2):
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False, indent=indent))
+
+
+def validate_dataset(data) -> list:
+    """Проверяет, что data — непустой список уровней с обязательными полями. Иначе ValueError."""
+    if not isinstance(data, list) or not data:
+        raise ValueError("ожидался непустой список уровней")
+    for level in data:
+        if not isinstance(level, dict) or any(level.get(field) is None for field in REQUIRED_FIELDS):
+            raise ValueError(f"некорректная запись: {level!r}"[:200])
+    return data
+
+
+def load_dataset(path: str) -> list:
+    """Читает и проверяет JSON с уровнями. Битый или пустой файл — ValueError."""
+    with open(path, "r", encoding="utf-8") as f:
+        return validate_dataset(json.load(f))
+
+
+class Checkpoint:
+    """
+    Журнал прогресса скрапера: по строке JSON на каждый собранный уровень,
+    только дописывание. Переживает падение процесса; оборванная последняя
+    строка при чтении пропускается. После успешного сохранения результата удаляется.
+    Списки собираются в параллельных потоках, поэтому запись идет под блокировкой.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(level) -> tuple:
+        # Ссылка содержит список и позицию, название отличает уровни, сдвинувшиеся между прогонами
+        return level.get("link"), level.get("name")
+
+    def load(self) -> dict:
+        """Записи прошлого незавершенного прогона: ключ уровня -> запись."""
+        records = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    records[self.key(record)] = record
+        except FileNotFoundError:
+            pass
+        return records
+
+    def record(self, level: dict):
+        line = json.dumps(level, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def retain(self, keep):
+        """Оставляет в журнале только записи, для которых keep(запись) истинно; пустой журнал удаляется."""
+        records = [record for record in self.load().values() if keep(record)]
+        if not records:
+            self.discard()
+            return
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            atomic_write_text(self.path, "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+
+    def discard(self):
+        self.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class DatasetWatcher:
+    """
+    Фоновый поток, который следит за файлом данных (опрос mtime/размера),
+    строит новый снимок вне горячего пути и отдает его в on_reload.
+    Если новый файл не прошел проверку, остается старый снимок.
+    """
+
+    def __init__(self, path: str, build, on_reload, interval: float = settings.RELOAD_CHECK_INTERVAL,
+                 on_error=None):
+        self.path = path
+        self.build = build            # list уровней -> готовый снимок (например, LevelSearch)
+        self.on_reload = on_reload    # принимает новый снимок
+        self.interval = interval
+        self.on_error = on_error      # принимает исключение, если новый файл отвергнут
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            return None
+
+    def check(self) -> bool:
+        """Одна проверка: True, если снимок был заменен."""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return False
+        self._signature = signature
+        started = time.time()
+        try:
+            snapshot = self.build(load_dataset(self.path))
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Новый {self.path} не прошел проверку, остаемся на старых данных: {e}")
+            if self.on_error is not None:
+                self.on_error(e)
+            return False
+        self.on_reload(snapshot)
+        print(f"🔄 Данные перезагружены в фоне за {time.time() - started:.2f} с")
+        return True
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"❌ Ошибка при перезагрузке данных: {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="dataset-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
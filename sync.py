@@ -0,0 +1,165 @@
+# sync.py
+"""
+Синхронизация локального JSON с опубликованным на GitHub.
+
+Запросы условные (If-None-Match / If-Modified-Since): если данные не менялись,
+сервер отвечает 304, и локальный файл не трогается — бот не перезагружается.
+Заголовки прошлого ответа и хэш тела лежат рядом с JSON в .meta.json.
+При изменениях считается поуровневый diff, по которому LevelSearch
+может обновить индексы без полной пересборки (см. LevelSearch.apply_diff).
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import requests
+
+import settings
+from lists import level_sort_key, list_of
+from storage import atomic_write_json, atomic_write_text, load_dataset, validate_dataset
+
+# Поля с деталями уровня; rank и link зависят от позиции в списке и в сравнение не входят
+DETAIL_FIELDS = ("length", "objects", "version")
+
+
+def meta_path_for(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + ".meta.json"
+
+
+def _load_meta(path: str) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _level_keys(levels) -> dict:
+    """
+    Ключ уровня — список, название и номер вхождения названия в этот список
+    (одинаковые названия в списке встречаются). Ссылка в ключ не годится:
+    она содержит позицию и меняется при сдвиге.
+    """
+    keys, seen = {}, {}
+    for level in sorted(levels, key=level_sort_key):
+        name = (list_of(level), level["name"])
+        seen[name] = seen.get(name, 0) + 1
+        keys[name + (seen[name],)] = level
+    return keys
+
+
+class DatasetDiff:
+    """Разница между двумя версиями списка уровней."""
+
+    def __init__(self, added=None, removed=None, moved=None, changed=None):
+        self.added = added or []      # новые уровни
+        self.removed = removed or []  # удаленные уровни
+        self.moved = moved or []      # (старый, новый) — уровень сменил ранг в своем списке
+        self.changed = changed or []  # (старый, новый, [поля]) — поменялись детали
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.moved or self.changed)
+
+    @property
+    def is_structural(self) -> bool:
+        """Изменился состав или порядок уровней — позиции в индексах сдвигаются."""
+        return bool(self.added or self.removed or self.moved)
+
+    def summary(self) -> str:
+        return (f"новых {len(self.added)}, удалено {len(self.removed)}, "
+                f"сдвинулось {len(self.moved)}, изменились детали {len(self.changed)}")
+
+    def __repr__(self):
+        return f"DatasetDiff({self.summary()})"
+
+
+def diff_datasets(old, new) -> DatasetDiff:
+    """Поуровневое сравнение: old и new — списки уровней (словари или объекты с .get)."""
+    old_keys, new_keys = _level_keys(old), _level_keys(new)
+    diff = DatasetDiff()
+    for key, level in new_keys.items():
+        previous = old_keys.get(key)
+        if previous is None:
+            diff.added.append(level)
+            continue
+        if previous["rank"] != level["rank"]:
+            diff.moved.append((previous, level))
+        fields = [f for f in DETAIL_FIELDS if previous.get(f) != level.get(f)]
+        if fields:
+            diff.changed.append((previous, level, fields))
+    diff.removed = [level for key, level in old_keys.items() if key not in new_keys]
+    return diff
+
+
+class SyncResult:
+    """Итог синхронизации: status — "not_modified" (304), "unchanged" или "updated"."""
+
+    def __init__(self, status: str, data=None, diff: DatasetDiff = None):
+        self.status = status
+        self.data = data
+        self.diff = diff
+
+    @property
+    def updated(self) -> bool:
+        return self.status == "updated"
+
+
+def sync_dataset(url: str = settings.GITHUB_RAW_URL, path: str = settings.LOCAL_DATA_PATH,
+                 session: requests.Session = None, timeout: float = settings.SYNC_TIMEOUT) -> SyncResult:
+    """
+    Скачивает данные, только если они изменились, и пишет JSON как есть (без переформатирования).
+    Ошибки сети — requests.RequestException, битые данные — ValueError; локальный файл при этом не меняется.
+    """
+    meta_path = meta_path_for(path)
+    meta = _load_meta(meta_path)
+    have_local = os.path.exists(path)
+
+    headers = {}
+    if have_local and meta.get("url") == url:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = (session or requests).get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return SyncResult("not_modified")
+    response.raise_for_status()
+
+    body = response.content
+    new_meta = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": hashlib.sha256(body).hexdigest(),
+    }
+    if have_local and new_meta["sha256"] == meta.get("sha256"):
+        # Сервер не поддерживает условные запросы, но тело то же самое
+        atomic_write_json(meta_path, new_meta)
+        return SyncResult("unchanged")
+
+    data = validate_dataset(json.loads(body))
+    diff = None
+    if have_local:
+        try:
+            diff = diff_datasets(load_dataset(path), data)
+        except (OSError, ValueError):
+            diff = None  # локальный файл битый — просто перезаписываем
+    if diff is not None and diff.is_empty:
+        atomic_write_json(meta_path, new_meta)
+        return SyncResult("unchanged", data, diff)
+
+    atomic_write_text(path, body.decode("utf-8"))
+    atomic_write_json(meta_path, new_meta)
+    return SyncResult("updated", data, diff)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Синхронизация demonlist.json с опубликованной версией")
+    parser.add_argument("--url", default=settings.GITHUB_RAW_URL)
+    parser.add_argument("--path", default=settings.LOCAL_DATA_PATH)
+    args = parser.parse_args()
+    result = sync_dataset(args.url, args.path)
+    print(f"🔄 {result.status}" + (f": {result.diff.summary()}" if result.diff else ""))
@@ -1,8 +1,17 @@
 # update_data.py
+import sys
+
 from scraper import DemonlistScraper
 
 if __name__ == "__main__":
     print("🚀 Запускаю плановое обновление данных Demonlist...")
     scraper = DemonlistScraper()
-    scraper.run()
-    print("✅ Обновление успешно завершено!")
\ No newline at end of file
+    failed = scraper.run()
+    if scraper.failed_lists:
+        # Остальные списки уже сохранены, но CI должен увидеть сбой
+        print(f"❌ Обновление завершено частично, не собраны списки: {', '.join(scraper.failed_lists)}")
+        sys.exit(1)
+    if failed:
+        print(f"⚠️ Обновление завершено, но без деталей осталось уровней: {len(failed)}")
+    else:
+        print("✅ Обновление успешно завершено!")
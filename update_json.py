@@ -1,36 +1,38 @@
 import requests
 import os
 from datetime import datetime
-from settings import GITHUB_RAW_URL, LOCAL_DATA_PATH, BOT_TOKEN, ADMIN_ID
+from settings import GITHUB_RAW_URL, LOCAL_DATA_PATH, BOT_TOKEN
+from sender import AdminNotifier, TelegramSender
+from sync import sync_dataset
+from search import LevelSearch
+from snapshot import snapshot_path_for, write_snapshot
+
+sender = TelegramSender(workers=1)
+admin = AdminNotifier(sender, f"https://api.telegram.org/bot{BOT_TOKEN}")
 
 def send_telegram_message(text):
-    """Отправляет уведомление администратору через Telegram"""
-    api_url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    data = {
-        "chat_id": ADMIN_ID,
-        "text": text,
-        "parse_mode": "HTML"
-    }
-    try:
-        requests.post(api_url, data=data, timeout=10)
-    except Exception as e:
-        print(f"❌ Не удалось отправить уведомление в Telegram: {e}")
+    """Отправляет уведомление администратору через Telegram (очередь с лимитами и повторами, см. sender.py)"""
+    admin.notify(text)
 
 def update_json():
     log_msg = f"🚀 [{datetime.now()}] Начинаем обновление demonlist.json...\n"
     print(log_msg.strip())
     try:
-        r = requests.get(GITHUB_RAW_URL, timeout=30)
-        r.raise_for_status()
-
-        os.makedirs(os.path.dirname(LOCAL_DATA_PATH), exist_ok=True)
-        with open(LOCAL_DATA_PATH, "w", encoding="utf-8") as f:
-            f.write(r.text)
-
-        success_msg = f"✅ Файл успешно обновлён: {LOCAL_DATA_PATH}"
-        print(success_msg)
-        log_msg += success_msg
-        send_telegram_message(f"✅ Demonlist обновлён успешно!\n{datetime.now()}")
+        # Условный запрос: без изменений файл не трогается и бот не перезагружается.
+        # Битый ответ не затирает рабочие данные, запись атомарная.
+        result = sync_dataset(GITHUB_RAW_URL, LOCAL_DATA_PATH)
+        if not result.updated:
+            success_msg = f"✅ Данные не изменились ({result.status}), файл не тронут"
+            print(success_msg)
+            log_msg += success_msg
+        else:
+            # Рядом кладем бинарный снимок для быстрого старта бота
+            write_snapshot(LevelSearch(result.data), snapshot_path_for(LOCAL_DATA_PATH), source=LOCAL_DATA_PATH)
+            changes = result.diff.summary() if result.diff else "полная загрузка"
+            success_msg = f"✅ Файл успешно обновлён: {LOCAL_DATA_PATH} ({changes})"
+            print(success_msg)
+            log_msg += success_msg
+            send_telegram_message(f"✅ Demonlist обновлён успешно!\n{changes}\n{datetime.now()}")
 
     except requests.exceptions.RequestException as e:
         err_msg = f"❌ Ошибка сети при обновлении: {e}"
@@ -48,5 +50,9 @@ def update_json():
     with open(log_file, "a", encoding="utf-8") as log:
         log.write(log_msg + "\n")
 
+    # Дожидаемся доставки уведомлений, иначе процесс завершится раньше
+    admin.flush()
+    sender.close()
+
 if __name__ == "__main__":
     update_json()